@@ -0,0 +1,169 @@
+import os
+import sys
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+import ml_utils
+import feature_store
+from fast_features import compute_user_features
+from windowed_features import perform_feature_engineering_windowed, rolling_cutoffs
+from synthetic import generate, user_payloads
+
+# Cek jalur-jalur cepat memberi fitur yang sama dengan pipeline pandas penuh
+# (perform_feature_engineering_final) di data sintetis. Exit 1 kalau ada yang beda.
+#
+#   fast      : fast_features (/predict) vs pipeline pandas, per user
+#   partials  : mode chunked + feature store (build lalu update_feature_store) vs hitung ulang penuh
+#   windowed  : perform_feature_engineering_windowed vs pipeline per window (event di-filter)
+#
+#   python benchmarks/check_equivalence.py
+#   python benchmarks/check_equivalence.py --trackings 100000 --seed 7 --check windowed
+# Beda urutan penjumlahan float ditoleransi (RTOL / ATOL), selain itu dianggap beda.
+RTOL = 1e-9
+ATOL = 1e-9
+CHECKS = ['fast', 'partials', 'windowed']
+
+# Kolom waktu event yang menentukan window (sama dengan windowed_features.py)
+WINDOW_TIME_COLUMNS = {'trackings': 'completed_at', 'submissions': 'created_at', 'exam_registrations': 'created_at'}
+
+
+def _copy(tables):
+    return {name: df.copy() for name, df in tables.items()}
+
+
+def compare(label, expected, got):
+    # expected & got: index developer_id, kolom ALL_FEATURES. Return list pesan beda
+    expected = expected[~expected.index.duplicated()]
+    problems = []
+    missing = expected.index.difference(got.index)
+    if len(missing):
+        problems.append(f"{label}: {len(missing)} developers missing, e.g. {missing[:5].tolist()}")
+    common = expected.index.intersection(got.index)
+    a = expected.loc[common, ml_utils.ALL_FEATURES].to_numpy(dtype=np.float64)
+    b = got.loc[common, ml_utils.ALL_FEATURES].to_numpy(dtype=np.float64)
+    diff = ~np.isclose(a, b, rtol=RTOL, atol=ATOL, equal_nan=True)
+    for j in np.flatnonzero(diff.any(axis=0)):
+        i = np.flatnonzero(diff[:, j])[0]
+        problems.append(
+            f"{label}: {ml_utils.ALL_FEATURES[j]} differs for {diff[:, j].sum()} developers, "
+            f"e.g. developer {common[i]}: expected {float(a[i, j])!r}, got {float(b[i, j])!r}"
+        )
+    return problems
+
+
+# --- 1. FAST PATH vs PANDAS ---
+def check_fast(tables, n_users):
+    problems = []
+    for payload in user_payloads(tables, n_users):
+        user_id, values = compute_user_features(payload)
+        # Sama seperti predict_user_category: body /predict dibungkus DataFrame apa adanya
+        expected = ml_utils.perform_feature_engineering_final({name: pd.DataFrame(rows) for name, rows in payload.items()})
+        got = pd.DataFrame([values], index=pd.Index([user_id], name='developer_id'))
+        problems += compare(f"fast user {user_id}", expected.loc[[user_id]], got)
+    return problems
+
+
+# --- 2. PARTIAL AGGREGATE MERGE vs FULL RECOMPUTE ---
+def _split_events(tables, fraction):
+    # Event lama (id kecil) vs event baru, seperti data yang masuk belakangan. Hasil ujian
+    # ikut registrasinya, user baru ikut bagian baru
+    old, new = {}, {}
+    for name, df in tables.items():
+        if name == 'exam_results': continue
+        cut = df['id'].quantile(fraction)
+        old[name], new[name] = df[df['id'] <= cut], df[df['id'] > cut]
+    results = tables['exam_results']
+    in_old = results['exam_registration_id'].isin(old['exam_registrations']['id'])
+    old['exam_results'], new['exam_results'] = results[in_old], results[~in_old]
+    return old, new
+
+
+def check_partials(tables, expected, chunksize):
+    problems = []
+
+    # Mode chunked: trackings & submissions (urut id) diringkas per chunk lalu digabung
+    def chunks(df):
+        return [df.iloc[i:i + chunksize] for i in range(0, len(df), chunksize)]
+    exams = {name: tables[name] for name in ['users', 'exam_registrations', 'exam_results']}
+    got = ml_utils.perform_feature_engineering_chunked(
+        _copy(exams), chunks(tables['trackings'].sort_values('id')), chunks(tables['submissions'].sort_values('id'))
+    )
+    problems += compare('chunked', expected, got)
+
+    # Feature store: build dari event lama, lalu dua kali update incremental
+    old, new = _split_events(tables, 0.5)
+    first, second = _split_events(new, 0.5) if all(len(df) for df in new.values()) else (new, {})
+    with tempfile.TemporaryDirectory() as path:
+        feature_store.build_feature_store(_copy(old), path)
+        for batch in (first, second):
+            if batch: feature_store.update_feature_store(_copy(batch), path)
+        problems += compare('feature store update', expected, feature_store.FeatureStore(path).to_frame())
+    return problems
+
+
+# --- 3. WINDOWED vs PER-WINDOW PIPELINE ---
+def _filter_window(tables, start, end):
+    out = _copy(tables)
+    for name, column in WINDOW_TIME_COLUMNS.items():
+        times = pd.to_datetime(out[name][column], errors='coerce')
+        in_window = times.notna() & (times < end)
+        if start is not None: in_window &= times >= start
+        out[name] = out[name][in_window]
+    out['exam_results'] = out['exam_results'][out['exam_results']['exam_registration_id'].isin(out['exam_registrations']['id'])]
+    return out
+
+
+def check_windowed(tables, window, n_cutoffs):
+    problems = []
+    cutoffs = rolling_cutoffs(tables, window)
+    for label, kwargs in [
+        (f'rolling {window}', {'window': window}),
+        ('cumulative', {'cutoffs': list(cutoffs[::max(len(cutoffs) // n_cutoffs, 1)])}),
+    ]:
+        result = perform_feature_engineering_windowed(_copy(tables), **kwargs)
+        for cutoff in result.index.get_level_values('cutoff').unique():
+            start = cutoff - pd.Timedelta(window) if 'window' in kwargs else None
+            expected = ml_utils.perform_feature_engineering_final(_filter_window(tables, start, cutoff))
+            problems += compare(f"windowed {label} @ {cutoff}", expected, result.xs(cutoff, level='cutoff'))
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--trackings', type=int, default=20_000, help='Skala data sintetis (jumlah baris trackings)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--check', nargs='+', choices=CHECKS, default=CHECKS)
+    parser.add_argument('--fast-users', type=int, default=200, help='Jumlah user untuk cek jalur cepat')
+    parser.add_argument('--chunksize', type=int, default=1000, help='Ukuran chunk untuk cek mode chunked')
+    parser.add_argument('--window', default='7D')
+    parser.add_argument('--cutoffs', type=int, default=5, help='Jumlah cutoff untuk cek snapshot kumulatif')
+    args = parser.parse_args()
+
+    tables = generate(args.trackings, args.seed)
+    failed = False
+    for name in args.check:
+        if name == 'fast':
+            problems = check_fast(tables, args.fast_users)
+        elif name == 'partials':
+            expected = ml_utils.perform_feature_engineering_final(_copy(tables))
+            problems = check_partials(tables, expected, args.chunksize)
+        else:
+            problems = check_windowed(tables, args.window, args.cutoffs)
+        for p in problems[:20]:
+            print(f"MISMATCH {p}", file=sys.stderr)
+        if len(problems) > 20:
+            print(f"... {len(problems) - 20} more", file=sys.stderr)
+        print(f"{name}: {'FAIL' if problems else 'OK'}")
+        failed |= bool(problems)
+    if failed: sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+import os
+import sys
+import json
+import time
+import socket
+import platform
+import argparse
+import resource
+import tempfile
+import subprocess
+import http.client
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+import ml_utils
+from synthetic import generate, write_csvs, user_payloads, CSV_FILES
+
+# Benchmark feature engineering, training, dan HTTP di beberapa skala data sintetis.
+# Skala = jumlah baris trackings (tabel lain ikut proporsional, lihat synthetic.py).
+#
+#   python benchmarks/run_benchmarks.py                      # 1k + 100k
+#   python benchmarks/run_benchmarks.py --scale 10m --skip-http
+#   python benchmarks/run_benchmarks.py --compare benchmarks/results/lama.json
+SCALES = {'1k': 1_000, '100k': 100_000, '10m': 10_000_000}
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+
+def timed(fn, *args, repeat=1):
+    # Ambil waktu terbaik dari beberapa kali jalan (lebih stabil dari rata-rata)
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def percentiles(latencies):
+    arr = np.asarray(latencies) * 1000
+    return {
+        'mean_ms': float(arr.mean()),
+        'p50_ms': float(np.percentile(arr, 50)),
+        'p90_ms': float(np.percentile(arr, 90)),
+        'p99_ms': float(np.percentile(arr, 99)),
+        'max_ms': float(arr.max()),
+    }
+
+
+# --- 1. FEATURE STAGES ---
+def bench_features(csv_dir, repeat):
+    stages = {}
+
+    def load():
+        return {name: pd.read_csv(f'{csv_dir}/{file}.csv') for name, file in CSV_FILES.items()}
+    stages['load_csv'], raw = timed(load)
+
+    tables = ['exam_results', 'exam_registrations', 'submissions', 'trackings']
+    stages['prepare_dates'], dfs = timed(ml_utils._prepare_tables, raw, tables, repeat=repeat)
+
+    stages['exams_partial'], exams = timed(ml_utils.exams_partial, dfs['exam_registrations'], dfs['exam_results'], repeat=repeat)
+    stages['submissions_partial'], submissions = timed(ml_utils.submissions_partial, dfs['submissions'], repeat=repeat)
+    stages['trackings_partial'], trackings = timed(ml_utils.trackings_partial, dfs['trackings'], repeat=repeat)
+    partials = {'exams': exams, 'submissions': submissions, 'trackings': trackings}
+
+    stages['exams_features'], _ = timed(ml_utils.exams_features, exams, repeat=repeat)
+    stages['submissions_features'], _ = timed(ml_utils.submissions_features, submissions, repeat=repeat)
+    stages['trackings_features'], _ = timed(ml_utils.trackings_features, trackings, repeat=repeat)
+    stages['build_features_from_partials'], df_features = timed(ml_utils.build_features_from_partials, dfs['users'], partials, repeat=repeat)
+
+    # End-to-end dari tabel mentah (string tanggal belum di-parse)
+    stages['perform_feature_engineering_final'], _ = timed(lambda: ml_utils.perform_feature_engineering_final(dict(raw)), repeat=repeat)
+    return {name: round(seconds, 6) for name, seconds in stages.items()}, df_features
+
+
+# --- 2. INFERENCE (in-process) ---
+def bench_inference(df_features, payloads, repeat):
+    from inference_script import predict_user_category, predict_user_category_fast, bundle
+    from main import InputData
+
+    X = df_features.reindex(columns=bundle.features).fillna(0).to_numpy(dtype=np.float64)
+    predict_all, _ = timed(bundle.predict, X, repeat=repeat)
+
+    # Per user: body request -> tabel (seperti /predict) -> hasil
+    tables_list = [InputData(**p).to_tables() for p in payloads]
+    fast = [timed(predict_user_category_fast, t)[0] for t in tables_list]
+    frames = [{name: pd.DataFrame(rows) for name, rows in t.items()} for t in tables_list]
+    pandas_path = [timed(predict_user_category, f)[0] for f in frames]
+
+    return {
+        'bundle_predict_all_s': round(predict_all, 6),
+        'bundle_predict_rows': len(X),
+        'predict_user_category_fast': percentiles(fast),
+        'predict_user_category': percentiles(pandas_path),
+    }
+
+
+# --- 3. TRAINING END-TO-END ---
+def bench_train(csv_dir, chunksize):
+    # train.py dijalankan di folder sementara (dataset_project/ & models/ di sana),
+    # jadi models/ di repo gak ketimpa
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.symlink(csv_dir, os.path.join(work_dir, 'dataset_project'))
+        cmd = [sys.executable, os.path.join(REPO_DIR, 'train.py')]
+        if chunksize: cmd += ['--chunksize', str(chunksize)]
+        start = time.perf_counter()
+        proc = subprocess.run(cmd, cwd=work_dir, capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"train.py failed:\n{proc.stderr[-2000:]}")
+    return {'train_s': round(elapsed, 3), 'chunksize': chunksize}
+
+
+# --- 4. HTTP (uvicorn lokal) ---
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _start_server(port, env):
+    proc = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning'],
+        cwd=REPO_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"uvicorn exited:\n{proc.stderr.read().decode()[-2000:]}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            conn.request('GET', '/')
+            if conn.getresponse().status == 200: return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("uvicorn did not start within 60s")
+
+
+def _post(conn, path, body):
+    start = time.perf_counter()
+    conn.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    response.read()
+    return time.perf_counter() - start, response.status
+
+
+def _load_test(port, path, bodies, n_requests, concurrency):
+    # Tiap thread satu koneksi keep-alive, body dipakai bergiliran
+    per_worker = [list(range(w, n_requests, concurrency)) for w in range(concurrency)]
+
+    def worker(indices):
+        conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        out = [_post(conn, path, bodies[i % len(bodies)]) for i in indices]
+        conn.close()
+        return out
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = [s for chunk in pool.map(worker, per_worker) for s in chunk]
+    elapsed = time.perf_counter() - start
+
+    latencies = [lat for lat, status in samples if status == 200]
+    statuses = pd.Series([status for _, status in samples]).value_counts()
+    result = {
+        'requests': n_requests,
+        'concurrency': concurrency,
+        'throughput_rps': round(n_requests / elapsed, 2),
+        'status_codes': {str(k): int(v) for k, v in statuses.items()},
+    }
+    if latencies: result.update(percentiles(latencies))
+    return result
+
+
+def bench_http(payloads, n_requests, concurrency, cache):
+    env = dict(os.environ)
+    # Default cache dimatikan: yang diukur hitungannya, bukan hit rate
+    if not cache: env['PREDICT_CACHE_SIZE'] = '0'
+    port = _free_port()
+    proc = _start_server(port, env)
+    try:
+        bodies = [json.dumps(p).encode() for p in payloads]
+        # Pemanasan (spawn worker process, import, dll) gak ikut dihitung
+        _load_test(port, '/predict', bodies, min(len(bodies), 20), 1)
+
+        batch = {name: [row for p in payloads for row in p[name]] for name in payloads[0]}
+        batch_body = [json.dumps(batch).encode()]
+        return {
+            'predict_sequential': _load_test(port, '/predict', bodies, n_requests, 1),
+            'predict_concurrent': _load_test(port, '/predict', bodies, n_requests, concurrency),
+            'predict_batch': dict(_load_test(port, '/predict_batch', batch_body, 20, 1), users_per_request=len(payloads)),
+        }
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def run_scale(scale, args):
+    n_rows = SCALES[scale]
+    result = {'trackings_rows': n_rows}
+
+    gen_time, tables = timed(generate, n_rows, args.seed)
+    result['rows'] = {name: len(df) for name, df in tables.items()}
+    result['generate_s'] = round(gen_time, 3)
+
+    # Stage besar cukup sekali, skala kecil diulang biar angkanya gak noise
+    repeat = 5 if n_rows <= 100_000 else 1
+    payloads = user_payloads(tables, args.sample_users)
+
+    with tempfile.TemporaryDirectory() as csv_dir:
+        write_csvs(tables, csv_dir)
+        del tables
+        print(f"[{scale}] feature stages...", file=sys.stderr)
+        result['features'], df_features = bench_features(csv_dir, repeat)
+        result['inference'] = bench_inference(df_features, payloads, repeat)
+        if not args.skip_train:
+            print(f"[{scale}] train.py...", file=sys.stderr)
+            result['train'] = bench_train(csv_dir, args.train_chunksize)
+
+    if not args.skip_http:
+        print(f"[{scale}] HTTP...", file=sys.stderr)
+        result['http'] = bench_http(payloads, args.requests, args.concurrency, args.cache)
+    return result
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _flatten(d, prefix=''):
+    for key, value in d.items():
+        if isinstance(value, dict): yield from _flatten(value, f'{prefix}{key}.')
+        elif isinstance(value, float): yield f'{prefix}{key}', value
+
+
+def compare(old, new, threshold):
+    # Metrik waktu (detik / ms) yang naik lebih dari threshold dianggap regresi
+    old_flat = dict(_flatten(old['results']))
+    regressions = []
+    for key, value in _flatten(new['results']):
+        is_time = key.endswith(('_s', '_ms')) or '.features.' in key
+        if not is_time: continue
+        before = old_flat.get(key)
+        if before and before > 0 and value / before > threshold:
+            regressions.append({'metric': key, 'before': before, 'after': value, 'ratio': round(value / before, 2)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', nargs='+', choices=list(SCALES), default=['1k', '100k'])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--sample-users', type=int, default=100, help='Jumlah user untuk benchmark per-request')
+    parser.add_argument('--requests', type=int, default=500, help='Jumlah request HTTP per skenario')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--cache', action='store_true', help='Jalankan server dengan result cache aktif')
+    parser.add_argument('--train-chunksize', type=int, default=0)
+    parser.add_argument('--skip-train', action='store_true')
+    parser.add_argument('--skip-http', action='store_true')
+    parser.add_argument('--output', default=None, help='File JSON hasil (default: benchmarks/results/<waktu>.json)')
+    parser.add_argument('--compare', default=None, help='JSON hasil sebelumnya, exit 1 kalau ada regresi')
+    parser.add_argument('--threshold', type=float, default=1.2, help='Rasio lambat yang dianggap regresi')
+    args = parser.parse_args()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': args.seed,
+        },
+        'results': {scale: run_scale(scale, args) for scale in args.scale},
+    }
+    # ru_maxrss dalam KB di Linux
+    report['meta']['peak_rss_mb'] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+    output = args.output or os.path.join(RESULTS_DIR, datetime.now().strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"Saved to {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        for r in regressions:
+            print(f"REGRESSION {r['metric']}: {r['before']:.6g} -> {r['after']:.6g} ({r['ratio']}x)", file=sys.stderr)
+        if regressions: sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
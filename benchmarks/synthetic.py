@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+
+# Generator data sintetis (seeded) dengan format tabel yang sama seperti yang dikirim
+# backend / CSV di dataset_project. Skala ditentukan jumlah baris trackings; tabel lain
+# ikut proporsional (~20 tracking per user, 1 submission per 10 tracking, dst).
+DAY = 24 * 3600
+START = np.datetime64('2023-01-01T00:00:00', 's')
+
+
+def _seconds(values):
+    return values.astype('timedelta64[s]')
+
+
+def generate(n_trackings, seed=42):
+    rng = np.random.default_rng(seed)
+    n_users = max(n_trackings // 20, 1)
+    user_ids = np.arange(1, n_users + 1)
+
+    # --- users ---
+    created_at = START + _seconds(rng.integers(0, 30 * DAY, n_users))
+    users = pd.DataFrame({'id': user_ids, 'created_at': created_at})
+
+    # Aktivitas per user miring (sebagian kecil user sangat aktif)
+    weights = rng.lognormal(0, 1, n_users)
+    weights /= weights.sum()
+
+    # --- trackings ---
+    dev = rng.choice(n_users, n_trackings, p=weights)
+    # Jam belajar: kebanyakan sore-malam, sebagian lewat tengah malam (owl)
+    day_offset = rng.integers(0, 120, n_trackings) * DAY
+    hour = rng.normal(20, 3, n_trackings).clip(0, 27.9)
+    first_opened_at = created_at[dev] + _seconds(day_offset + (hour * 3600).astype(np.int64))
+    duration = rng.lognormal(np.log(12 * 60), 0.8, n_trackings).astype(np.int64)
+    is_completed = rng.random(n_trackings) < 0.75
+    completed_at = np.where(is_completed, first_opened_at + _seconds(duration), np.datetime64('NaT'))
+    revisit = rng.random(n_trackings) < 0.3
+    view_gap = np.where(revisit, rng.exponential(2 * DAY, n_trackings), rng.uniform(0, 300, n_trackings)).astype(np.int64)
+    last_viewed = np.where(is_completed, completed_at + _seconds(view_gap), first_opened_at + _seconds(duration // 2))
+    trackings = pd.DataFrame({
+        'id': np.arange(1, n_trackings + 1),
+        'developer_id': user_ids[dev],
+        'journey_id': rng.integers(1, 20, n_trackings),
+        'tutorial_id': rng.integers(1, 500, n_trackings),
+        'status': np.where(is_completed, 'completed', 'started'),
+        'last_viewed': last_viewed,
+        'first_opened_at': first_opened_at,
+        'completed_at': completed_at,
+    })
+
+    # --- submissions (id naik sesuai urutan waktu, seperti auto increment) ---
+    n_submissions = max(n_trackings // 10, 1)
+    sub_created_at = np.sort(START + _seconds(rng.integers(30 * DAY, 150 * DAY, n_submissions)))
+    status = rng.choice([-2, -1, 1, 2], n_submissions, p=[0.1, 0.3, 0.4, 0.2])
+    reviewed = status != -2
+    submissions = pd.DataFrame({
+        'id': np.arange(1, n_submissions + 1),
+        'submitter_id': user_ids[rng.choice(n_users, n_submissions, p=weights)],
+        'quiz_id': rng.integers(1, 50, n_submissions),
+        'status': status,
+        'created_at': sub_created_at,
+        'ended_review_at': np.where(reviewed, sub_created_at + _seconds(rng.integers(3600, 72 * 3600, n_submissions)), np.datetime64('NaT')),
+        'rating': np.where(status > 0, rng.integers(1, 6, n_submissions), np.nan),
+    })
+
+    # --- exam_registrations & exam_results ---
+    n_exams = max(n_trackings // 20, 1)
+    exam_created_at = START + _seconds(rng.integers(30 * DAY, 150 * DAY, n_exams))
+    finished = rng.random(n_exams) < 0.9
+    exam_registrations = pd.DataFrame({
+        'id': np.arange(1, n_exams + 1),
+        'examinees_id': user_ids[rng.choice(n_users, n_exams, p=weights)],
+        'tutorial_id': rng.integers(1, 500, n_exams),
+        'created_at': exam_created_at,
+        'deadline_at': exam_created_at + _seconds(np.full(n_exams, 2 * 3600)),
+        'exam_finished_at': np.where(finished, exam_created_at + _seconds(rng.integers(600, 7800, n_exams)), np.datetime64('NaT')),
+    })
+    exam_results = pd.DataFrame({
+        'id': np.arange(1, finished.sum() + 1),
+        'exam_registration_id': exam_registrations['id'][finished].to_numpy(),
+        'score': rng.integers(0, 101, finished.sum()),
+        'total_questions': rng.integers(10, 51, finished.sum()),
+    })
+
+    return {
+        'users': users,
+        'trackings': trackings,
+        'submissions': submissions,
+        'exam_registrations': exam_registrations,
+        'exam_results': exam_results,
+    }
+
+
+def _records(df):
+    # Format body request: tanggal jadi string, NaN/NaT jadi null
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.strftime('%Y-%m-%d %H:%M:%S')
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+def user_payloads(tables, n_users):
+    # Satu body /predict per user (n_users pertama)
+    ids = tables['users']['id'].to_numpy()[:n_users]
+    keys = {'trackings': 'developer_id', 'submissions': 'submitter_id', 'exam_registrations': 'examinees_id'}
+    subset = {name: tables[name][tables[name][col].isin(ids)] for name, col in keys.items()}
+    subset['users'] = tables['users'][tables['users']['id'].isin(ids)]
+    subset['exam_results'] = tables['exam_results'][tables['exam_results']['exam_registration_id'].isin(subset['exam_registrations']['id'])]
+
+    grouped = {name: {k: _records(g) for k, g in df.groupby(keys.get(name, 'id'))} for name, df in subset.items() if name != 'exam_results'}
+    results_by_reg = {k: _records(g) for k, g in subset['exam_results'].groupby('exam_registration_id')}
+
+    payloads = []
+    for user_id in ids:
+        registrations = grouped['exam_registrations'].get(user_id, [])
+        payloads.append({
+            'users': grouped['users'].get(user_id, []),
+            'trackings': grouped['trackings'].get(user_id, []),
+            'submissions': grouped['submissions'].get(user_id, []),
+            'exam_registrations': registrations,
+            'exam_results': [r for reg in registrations for r in results_by_reg.get(reg['id'], [])],
+        })
+    return payloads
+
+
+def batch_payload(tables):
+    # Satu body /predict_batch berisi semua tabel
+    return {name: _records(df) for name, df in tables.items()}
+
+
+# Nama file CSV yang dibaca train.py
+CSV_FILES = {
+    'users': 'users',
+    'trackings': 'developer_journey_trackings',
+    'submissions': 'developer_journey_submissions',
+    'exam_registrations': 'exam_registrations',
+    'exam_results': 'exam_results',
+}
+
+
+def write_csvs(tables, folder):
+    for name, df in tables.items():
+        df.to_csv(f'{folder}/{CSV_FILES[name]}.csv', index=False)
@@ -0,0 +1,214 @@
+import math
+from collections import Counter, defaultdict
+from datetime import datetime, date, timedelta
+
+# Cuma konstanta (bukan ml_utils), jadi jalur cepat tidak ikut import pandas
+from feature_schema import ALL_FEATURES, FEATURE_GROUPS
+
+# Jalur cepat untuk SATU user (request /predict): fitur yang sama persis dengan
+# perform_feature_engineering_final, tapi dihitung langsung dari list of dict
+# (hasil parsing request) pakai Python biasa. Untuk satu user, overhead bikin
+# DataFrame/merge/groupby di pandas jauh lebih besar dari hitungannya sendiri.
+# Aturan tiap fitur mengikuti komentar "Sesuai TXT" di ml_utils.py.
+
+OWL_OFFSET = timedelta(hours=2)
+REVISIT_BUFFER = timedelta(minutes=10)
+
+
+def _parse_dt(value):
+    # Setara pd.to_datetime(errors='coerce') untuk format yang dikirim backend
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        dt = value
+    elif isinstance(value, date):
+        dt = datetime(value.year, value.month, value.day)
+    elif isinstance(value, str):
+        try:
+            dt = datetime.fromisoformat(value.strip())
+        except ValueError:
+            return None
+    else:
+        return None
+    # Jam lokal sesuai offset yang dikirim (sama seperti pandas untuk offset seragam)
+    return dt.replace(tzinfo=None) if dt.tzinfo is not None else dt
+
+
+def _num(value):
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return None if isinstance(value, float) and math.isnan(value) else float(value)
+    return None
+
+
+def _mean(values):
+    return math.fsum(values) / len(values) if values else 0.0
+
+
+def _is_completed(status):
+    if status is None or (isinstance(status, float) and math.isnan(status)):
+        return False
+    text = str(status).lower()
+    return 'completed' in text or 'passed' in text or '1' in text
+
+
+def target_user_id(tables):
+    # User yang diprediksi = baris pertama users, fallback ke developer pertama di trackings/submissions
+    users = tables.get('users') or []
+    if users:
+        return users[0].get('id')
+    for table, column in [('trackings', 'developer_id'), ('submissions', 'submitter_id')]:
+        for row in tables.get(table) or []:
+            if row.get(column) is not None:
+                return row[column]
+    return None
+
+
+def _exam_features(tables, user_id):
+    registrations = tables.get('exam_registrations') or []
+    results = tables.get('exam_results') or []
+    user_registrations = [r for r in registrations if r.get('examinees_id') == user_id]
+
+    # --- 2. avg_weighted_exam_score ---
+    # Inner join results -> registrations milik user (bisa match lebih dari sekali)
+    registration_count = Counter(r.get('id') for r in user_registrations)
+    weighted, questions = [], []
+    for res in results:
+        n = registration_count.get(res.get('exam_registration_id'), 0)
+        if not n: continue
+        score, total_questions = _num(res.get('score')), _num(res.get('total_questions'))
+        if score is not None and total_questions is not None:
+            weighted.extend([score * total_questions] * n)
+        if total_questions is not None:
+            questions.extend([total_questions] * n)
+    sum_questions = math.fsum(questions)
+    avg_weighted_exam_score = math.fsum(weighted) / (sum_questions if sum_questions != 0 else 1)
+
+    # --- 3. exam_duration_utilization_ratio ---
+    ratios = []
+    for reg in user_registrations:
+        created_at = _parse_dt(reg.get('created_at'))
+        deadline_at = _parse_dt(reg.get('deadline_at'))
+        finished_at = _parse_dt(reg.get('exam_finished_at'))
+        if finished_at is None or created_at is None or deadline_at is None or not deadline_at > created_at:
+            continue
+        ratio = (finished_at - created_at).total_seconds() / (deadline_at - created_at).total_seconds()
+        ratios.append(min(max(ratio, 0.0), 1.0))
+
+    return {
+        'avg_weighted_exam_score': avg_weighted_exam_score,
+        'exam_duration_utilization_ratio': _mean(ratios),
+    }
+
+
+def _submission_features(tables, user_id):
+    submissions = [s for s in tables.get('submissions') or [] if s.get('submitter_id') == user_id]
+
+    # --- 4 & 5. Revisi per quiz (status != -2, quiz kosong diabaikan seperti groupby pandas) ---
+    by_quiz = defaultdict(list)
+    for sub in submissions:
+        if sub.get('status') != -2 and sub.get('quiz_id') is not None:
+            by_quiz[sub['quiz_id']].append(sub)
+
+    revision_counts, revision_hours = [], []
+    for rows in by_quiz.values():
+        revision_counts.append(sum(1 for r in rows if r.get('status') == -1))
+        rows = sorted(rows, key=lambda r: (r.get('id') is None, r.get('id') or 0))
+        for prev, cur in zip(rows, rows[1:]):
+            prev_ended, created_at = _parse_dt(prev.get('ended_review_at')), _parse_dt(cur.get('created_at'))
+            if prev_ended is None or created_at is None: continue
+            hours = (created_at - prev_ended).total_seconds() / 3600
+            if 0 < hours <= 720:
+                revision_hours.append(hours)
+
+    # --- 6. avg_submission_rating ---
+    ratings = [r for r in (_num(s.get('rating')) for s in submissions) if r is not None]
+
+    return {
+        'avg_submission_revision_count': _mean(revision_counts),
+        'avg_submission_revision_duration': _mean(revision_hours),
+        'avg_submission_rating': _mean(ratings),
+    }
+
+
+def _tracking_features(tables, user_id):
+    all_trackings = tables.get('trackings') or []
+    # Sama seperti pandas: kolom status ada kalau minimal satu baris punya status
+    has_status = any('status' in t for t in all_trackings)
+    trackings = [t for t in all_trackings if t.get('developer_id') == user_id]
+
+    learning_dates, tutorials, adjusted_times = set(), set(), []
+    revisits, durations = [], []
+    for t in trackings:
+        completed_at = _parse_dt(t.get('completed_at'))
+        first_opened_at = _parse_dt(t.get('first_opened_at'))
+        is_done = _is_completed(t.get('status')) if has_status else completed_at is not None
+
+        if is_done:
+            if t.get('tutorial_id') is not None:
+                tutorials.add(t['tutorial_id'])
+            if completed_at is not None:
+                # Owl Adjustment (2 Jam)
+                adjusted = completed_at - OWL_OFFSET
+                adjusted_times.append(adjusted)
+                learning_dates.add(adjusted.date())
+                last_viewed = _parse_dt(t.get('last_viewed'))
+                if first_opened_at is not None and last_viewed is not None:
+                    revisits.append(1.0 if last_viewed > completed_at + REVISIT_BUFFER else 0.0)
+
+        # Durasi (tanpa filter status) - Filter Idle: > 0 dan <= 30 menit
+        if completed_at is not None and first_opened_at is not None:
+            minutes = (completed_at - first_opened_at).total_seconds() / 60
+            if 0 < minutes <= 30:
+                durations.append(minutes)
+
+    active_days = len(learning_dates)
+    total_completed = len(tutorials)
+
+    consistency_score = 0.0
+    if adjusted_times:
+        total_days = (max(adjusted_times) - min(adjusted_times)).days + 1
+        total_weeks = math.ceil(total_days / 7)
+        # Minggu ala strftime('%U') (mulai hari Minggu), dihitung pakai int
+        active_weeks = len({(d.year, (d.timetuple().tm_yday - 1 + 7 - (d.weekday() + 1) % 7) // 7) for d in learning_dates})
+        consistency_score = min(0.7 * (active_weeks / total_weeks) + 0.3 * (active_days / total_days), 1.0)
+
+    return {
+        'active_days': float(active_days),
+        'total_completed_tutorials': float(total_completed),
+        'completion_density': total_completed / (active_days if active_days else 1),
+        'consistency_score': consistency_score,
+        'tutorial_revisit_rate': _mean(revisits),
+        'avg_tutorial_duration': _mean(durations),
+    }
+
+
+# Tabel fitur (sama dengan group di feature_registry) -> fungsi jalur cepatnya
+TABLE_FUNCTIONS = {
+    'exams': _exam_features,
+    'submissions': _submission_features,
+    'trackings': _tracking_features,
+}
+# Fitur -> tabel fitur (pengganti feature_registry.group_of, yang butuh ml_utils ter-import)
+FEATURE_TABLES = {name: table for table, names in FEATURE_GROUPS.items() for name in names}
+
+
+def _table_of(name):
+    if name not in FEATURE_TABLES:
+        raise KeyError(f"Unknown feature '{name}' (the fast path only computes ALL_FEATURES)")
+    return FEATURE_TABLES[name]
+
+
+def compute_user_features(tables, features=ALL_FEATURES):
+    # tables: dict nama tabel -> list of dict (format body request /predict)
+    # features: fitur yang dibutuhkan, tabel yang tidak dipakai fitur manapun dilewati.
+    # Return (user_id, dict fitur) atau (None, None) kalau tidak ada user.
+    user_id = target_user_id(tables)
+    if user_id is None:
+        return None, None
+
+    values = {}
+    for table in dict.fromkeys(_table_of(name) for name in features):
+        values.update(TABLE_FUNCTIONS[table](tables, user_id))
+    return user_id, {name: values[name] for name in features}
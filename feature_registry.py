@@ -0,0 +1,102 @@
+from collections import Counter
+from metrics import stage
+
+# Registry fitur: tiap node (fitur atau intermediate bersama, misal mask trackings
+# completed) mendeklarasikan input-nya (tabel mentah atau node lain) + kolom tabel
+# yang dibaca. evaluate() cuma menghitung node yang dibutuhkan fitur yang diminta,
+# masing-masing sekali, dan intermediate langsung dilepas dari memori begitu semua
+# pemakainya selesai.
+#
+# Fitur eksperimen cukup di-register (tanpa masuk ALL_FEATURES di ml_utils):
+# tidak ikut dihitung kecuali ada yang memintanya secara eksplisit.
+
+
+class Node:
+    def __init__(self, name, fn, depends, columns, group):
+        self.name = name
+        self.fn = fn
+        self.depends = depends
+        self.columns = columns  # tabel mentah -> kolom yang dibaca node ini
+        self.group = group      # tabel fitur ('exams' / 'submissions' / 'trackings'), None = intermediate
+
+
+NODES = {}
+
+
+def register(name, depends=(), columns=None, group=None):
+    # Dekorator: fungsi dipanggil dengan nilai depends sesuai urutan. Nama di depends
+    # yang bukan node dianggap input (tabel mentah / partial) dari context evaluate().
+    def decorator(fn):
+        if name in NODES:
+            raise ValueError(f"Feature node '{name}' is already registered")
+        NODES[name] = Node(name, fn, tuple(depends), dict(columns or {}), group)
+        return fn
+    return decorator
+
+
+def group_of(name):
+    node = NODES.get(name)
+    if node is None or node.group is None:
+        raise KeyError(f"Unknown feature '{name}'")
+    return node.group
+
+
+def resolve(names, known=None):
+    # Urutan topologis node yang perlu dihitung untuk names. Nama yang ada di known
+    # (sudah dihitung / input) dilewati; known=None = semua non-node dianggap input.
+    order, visiting, done = [], set(), set(known or ())
+
+    def visit(name, path):
+        if name in done: return
+        node = NODES.get(name)
+        if node is None:
+            if known is None and path: return
+            needed_by = f" (needed by '{path[-1]}')" if path else ''
+            raise KeyError(f"Unknown feature or missing input '{name}'{needed_by}")
+        if name in visiting:
+            raise ValueError(f"Feature dependency cycle: {' -> '.join(path + (name,))}")
+        visiting.add(name)
+        for dep in node.depends:
+            visit(dep, path + (name,))
+        visiting.discard(name)
+        done.add(name)
+        order.append(node)
+
+    for name in names:
+        visit(name, ())
+    return order
+
+
+def required_columns(names):
+    # Tabel mentah -> kolom yang dibaca untuk menghitung names (buat proyeksi kolom)
+    columns = {}
+    for node in resolve(names):
+        for table, cols in node.columns.items():
+            columns.setdefault(table, set()).update(cols)
+    return columns
+
+
+def _rows(values):
+    for value in values:
+        shape = getattr(value, 'shape', None)
+        if shape: return shape[0]
+    return None
+
+
+def evaluate(names, context):
+    # context: input yang sudah ada (tabel mentah / partial tersimpan), tidak diubah.
+    # Return {name: nilai} untuk names
+    context = dict(context)
+    order = resolve(names, context)
+    keep = set(names) | set(context)
+    pending = Counter(dep for node in order for dep in node.depends)
+    for node in order:
+        args = [context[dep] for dep in node.depends]
+        with stage(node.name, rows_in=_rows(args)) as s:
+            context[node.name] = node.fn(*args)
+            s.rows_out = _rows([context[node.name]])
+        del args
+        for dep in node.depends:
+            pending[dep] -= 1
+            if not pending[dep] and dep not in keep: del context[dep]
+    return {name: context[name] for name in names}
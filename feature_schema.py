@@ -0,0 +1,42 @@
+# Nama kolom & fitur (konstanta saja, tanpa pandas): dipakai ml_utils dan jalur cepat
+# /predict (fast_features.py) yang tidak perlu import pandas sama sekali.
+
+# Kolom mentah yang benar-benar dibaca feature engineering (dipakai juga buat usecols di train.py)
+TRACKING_COLUMNS = ['developer_id', 'tutorial_id', 'status', 'last_viewed', 'first_opened_at', 'completed_at']
+SUBMISSION_COLUMNS = ['id', 'submitter_id', 'quiz_id', 'status', 'created_at', 'ended_review_at', 'rating']
+EXAM_REGISTRATION_COLUMNS = ['id', 'examinees_id', 'created_at', 'deadline_at', 'exam_finished_at']
+EXAM_RESULT_COLUMNS = ['exam_registration_id', 'score', 'total_questions']
+USER_COLUMNS = ['id', 'created_at']
+# Semua tabel yang dipakai fitur -> kolomnya
+FEATURE_COLUMNS = {
+    'users': USER_COLUMNS,
+    'trackings': TRACKING_COLUMNS,
+    'submissions': SUBMISSION_COLUMNS,
+    'exam_registrations': EXAM_REGISTRATION_COLUMNS,
+    'exam_results': EXAM_RESULT_COLUMNS,
+}
+
+EXAM_FEATURES = ['avg_weighted_exam_score', 'exam_duration_utilization_ratio']
+TRACKING_FEATURES = ['active_days', 'total_completed_tutorials', 'completion_density',
+                     'consistency_score', 'tutorial_revisit_rate', 'avg_tutorial_duration']
+SUBMISSION_FEATURES = ['avg_submission_revision_count', 'avg_submission_revision_duration', 'avg_submission_rating']
+ALL_FEATURES = EXAM_FEATURES + SUBMISSION_FEATURES + TRACKING_FEATURES
+# Tabel fitur -> fitur standar di dalamnya (sama dengan group node di registry ml_utils)
+FEATURE_GROUPS = {'exams': EXAM_FEATURES, 'submissions': SUBMISSION_FEATURES, 'trackings': TRACKING_FEATURES}
+
+DATE_COLUMNS = {
+    'exam_registrations': ['created_at', 'deadline_at', 'exam_finished_at'],
+    'submissions': ['created_at', 'ended_review_at'],
+    'trackings': ['last_viewed', 'first_opened_at', 'completed_at'],
+}
+
+# Tabel mentah sumber fitur tiap tabel fitur
+TABLE_INPUTS = {
+    'exams': ['exam_registrations', 'exam_results'],
+    'submissions': ['submissions'],
+    'trackings': ['trackings'],
+}
+
+
+# Kolom id (kunci groupby/merge), disimpan int32 kalau muat di ml_utils
+ID_COLUMNS = ['id', 'developer_id', 'submitter_id', 'examinees_id', 'exam_registration_id', 'tutorial_id', 'quiz_id']
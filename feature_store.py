@@ -0,0 +1,226 @@
+import os
+import json
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from ml_utils import (
+    ALL_FEATURES,
+    compute_partials,
+    merge_partials,
+    build_features_from_partials,
+)
+
+# Feature store: hasil perform_feature_engineering_final per developer_id + partial
+# aggregate (sufficient statistics) tiap user, supaya event baru bisa di-update
+# tanpa replay seluruh histori.
+#
+#   meta.json                            -> versi aktif (data_dir) + kolom + jumlah user
+#   <data_dir>/ids.npy, features.npy     -> matriks fitur (memory-mapped, urut developer_id)
+#   <data_dir>/<tabel>_<bagian>.parquet  -> partial aggregate per user
+#
+# Tiap save menulis direktori data_dir baru, lalu meta.json di-swap (tmp + rename) paling
+# akhir. Pembaca selalu dapat satu versi utuh, gak pernah campuran file lama & baru.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FEATURE_STORE_DIR = os.getenv('FEATURE_STORE_DIR', os.path.join(BASE_DIR, 'feature_store'))
+STORE_VERSION = 1
+
+# Bagian tiap partial + kolom developer-nya (None = level pertama index)
+PARTIAL_PARTS = {
+    'exams': {'stats': None, 'registrations': 'examinees_id'},
+    'submissions': {'stats': None, 'quizzes': None},
+    'trackings': {'stats': None, 'days': 'developer_id', 'tutorials': 'developer_id'},
+}
+
+# Tabel mentah sumber tiap partial
+PARTIAL_SOURCES = {
+    'exams': ['exam_registrations', 'exam_results'],
+    'submissions': ['submissions'],
+    'trackings': ['trackings'],
+}
+
+
+def _partial_path(path, table, part):
+    return os.path.join(path, f'{table}_{part}.parquet')
+
+
+def _read_meta(path):
+    meta_path = os.path.join(path, 'meta.json')
+    if not os.path.exists(meta_path): return None
+    with open(meta_path) as f:
+        return json.load(f)
+
+
+def _data_path(path, meta):
+    # Store lama (sebelum ada data_dir) menyimpan file langsung di path
+    return os.path.join(path, meta['data_dir']) if meta and meta.get('data_dir') else path
+
+
+def save_feature_store(df_features, partials, path=FEATURE_STORE_DIR):
+    os.makedirs(path, exist_ok=True)
+    previous = _read_meta(path)
+    # Direktori versi baru, belum dirujuk meta.json jadi aman ditulis pelan-pelan
+    data_path = tempfile.mkdtemp(prefix='data-', dir=path)
+    os.chmod(data_path, 0o755)  # mkdtemp bikin 0700, server bisa jalan sebagai user lain
+
+    # 1. Partial aggregate (Parquet)
+    for table, parts in PARTIAL_PARTS.items():
+        if partials.get(table) is None: continue
+        for part in parts:
+            partials[table][part].to_parquet(_partial_path(data_path, table, part))
+
+    # 2. Matriks fitur, urut developer_id biar lookup cukup pakai searchsorted
+    df_features = df_features[~df_features.index.duplicated(keep='last')].sort_index()
+    ids = df_features.index.to_numpy(dtype=np.int64)
+    values = df_features.reindex(columns=ALL_FEATURES).fillna(0).to_numpy(dtype=np.float64)
+    np.save(os.path.join(data_path, 'ids.npy'), ids)
+    np.save(os.path.join(data_path, 'features.npy'), values)
+
+    # 3. Swap versi aktif: rename meta.json atomic
+    meta = {'version': STORE_VERSION, 'data_dir': os.path.basename(data_path), 'columns': ALL_FEATURES, 'n_users': len(ids)}
+    tmp_path = os.path.join(path, 'meta.tmp.json')
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(path, 'meta.json'))
+
+    # Versi sebelumnya disisakan (pembaca yang baru baca meta lama masih bisa buka filenya),
+    # yang lebih tua dibuang
+    keep = {meta['data_dir'], (previous or {}).get('data_dir')}
+    for name in os.listdir(path):
+        if name.startswith('data-') and name not in keep:
+            shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+
+
+def build_feature_store(dfs, path=FEATURE_STORE_DIR):
+    # Build dari nol (histori lengkap semua user)
+    partials = compute_partials(dfs)
+    df_features = build_features_from_partials(dfs.get('users'), partials)
+    save_feature_store(df_features, partials, path)
+    return df_features
+
+
+def load_partials(path=FEATURE_STORE_DIR):
+    data_path = _data_path(path, _read_meta(path))
+    partials = {}
+    for table, parts in PARTIAL_PARTS.items():
+        if not os.path.exists(_partial_path(data_path, table, 'stats')):
+            partials[table] = None
+            continue
+        partials[table] = {part: pd.read_parquet(_partial_path(data_path, table, part)) for part in parts}
+    return partials
+
+
+def _select_partials(partials, developer_ids, exclude=False):
+    # Ambil (atau buang) partial milik developer tertentu saja
+    selected = {}
+    for table, partial in partials.items():
+        if partial is None:
+            selected[table] = None
+            continue
+        selected[table] = {}
+        for part, column in PARTIAL_PARTS[table].items():
+            df = partial[part]
+            keys = df.index.get_level_values(0) if column is None else df[column]
+            mask = np.asarray(keys.isin(developer_ids))
+            selected[table][part] = df[~mask] if exclude else df[mask]
+    return selected
+
+
+def _concat_partials(a, b):
+    # Gabung partial dari dua kelompok user yang berbeda (tidak perlu agregasi ulang)
+    combined = {}
+    for table, parts in PARTIAL_PARTS.items():
+        present = [p[table] for p in (a, b) if p.get(table) is not None]
+        combined[table] = {part: pd.concat([p[part] for p in present]) for part in parts} if present else None
+    return combined
+
+
+def _developer_ids(partials):
+    ids = [p['stats'].index.get_level_values(0).to_series() for p in partials.values() if p is not None]
+    if partials['exams'] is not None:
+        ids.append(partials['exams']['registrations']['examinees_id'])
+    return pd.concat(ids).unique() if ids else np.array([], dtype=np.int64)
+
+
+def update_feature_store(new_dfs, path=FEATURE_STORE_DIR, replace=False):
+    # Update incremental dari event baru (trackings, submissions, exam_registrations,
+    # exam_results, users baru). Hanya partial & fitur user yang terdampak yang dihitung ulang.
+    #
+    # Default (replace=False): new_dfs berisi event BARU saja (append-only, id submission
+    # lebih besar dari yang sudah tersimpan). Kalau ada baris lama yang berubah (misal
+    # status tracking dari started -> completed), kirim histori lengkap user tersebut
+    # dengan replace=True supaya partial mereka diganti, bukan ditambah.
+    stored = load_partials(path)
+
+    # Hasil ujian baru boleh merujuk registrasi yang sudah tersimpan
+    known_registrations = stored['exams']['registrations'] if stored['exams'] is not None else None
+    new_partials = compute_partials(new_dfs, known_registrations)
+
+    affected = _developer_ids(new_partials)
+    users = new_dfs.get('users', pd.DataFrame())
+    if not users.empty:
+        affected = pd.unique(np.concatenate([affected, users['id'].to_numpy()]))
+
+    stored_rest = _select_partials(stored, affected, exclude=True)
+    stored_affected = _select_partials(stored, affected)
+    if replace:
+        # Tabel yang dikirim dianggap histori lengkap, partial lamanya dibuang
+        for table, sources in PARTIAL_SOURCES.items():
+            if any(src in new_dfs for src in sources): stored_affected[table] = None
+    affected_partials = _select_partials(merge_partials(stored_affected, new_partials), affected)
+
+    # Hitung ulang fitur hanya untuk user terdampak, sisanya tetap dari store
+    base_users = pd.DataFrame({'id': affected, 'created_at': pd.NaT})
+    df_updated = build_features_from_partials(base_users, affected_partials)[ALL_FEATURES]
+
+    if _read_meta(path) is not None:
+        df_existing = FeatureStore(path).to_frame()
+        df_features = pd.concat([df_existing[~df_existing.index.isin(affected)], df_updated])
+    else:
+        df_features = df_updated
+
+    save_feature_store(df_features, _concat_partials(stored_rest, affected_partials), path)
+    return df_updated
+
+
+class FeatureStore:
+    # Reader: ids & fitur di-memory-map, lookup per user = searchsorted (mikrodetik)
+    def __init__(self, path=FEATURE_STORE_DIR):
+        self.meta = _read_meta(path)
+        if self.meta is None:
+            raise FileNotFoundError(f"Feature store not found: {os.path.join(path, 'meta.json')}")
+        self.columns = self.meta['columns']
+        data_path = _data_path(path, self.meta)
+        self.ids = np.load(os.path.join(data_path, 'ids.npy'), mmap_mode='r')
+        self.values = np.load(os.path.join(data_path, 'features.npy'), mmap_mode='r')
+        # Jaga-jaga file gak sepasang (misal store lama yang ditulis tanpa swap atomic)
+        n_users = self.meta['n_users']
+        if len(self.ids) != n_users or self.values.shape != (n_users, len(self.columns)):
+            raise ValueError(
+                f"Feature store {path} is inconsistent: meta.json says {n_users} users x {len(self.columns)} "
+                f"features, ids.npy has {len(self.ids)}, features.npy has shape {self.values.shape}"
+            )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def get(self, developer_id):
+        pos = int(np.searchsorted(self.ids, developer_id))
+        if pos == len(self.ids) or self.ids[pos] != developer_id:
+            return None
+        return dict(zip(self.columns, self.values[pos].tolist()))
+
+    def get_many(self, developer_ids):
+        developer_ids = np.asarray(developer_ids, dtype=np.int64)
+        if len(self.ids) == 0:
+            return pd.DataFrame(index=pd.Index([], name='developer_id'), columns=self.columns)
+        pos = np.searchsorted(self.ids, developer_ids).clip(max=len(self.ids) - 1)
+        found = self.ids[pos] == developer_ids
+        return pd.DataFrame(
+            self.values[pos[found]],
+            index=pd.Index(developer_ids[found], name='developer_id'),
+            columns=self.columns
+        )
+
+    def to_frame(self):
+        return pd.DataFrame(np.asarray(self.values), index=pd.Index(np.asarray(self.ids), name='developer_id'), columns=self.columns)
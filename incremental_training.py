@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+from scipy.optimize import linear_sum_assignment
+from model_bundle import ModelBundle
+
+# Training incremental: centroid KMeans yang sudah ada di-update pakai user baru /
+# berubah saja (update ala MiniBatchKMeans.partial_fit), bukan fit ulang semua user.
+# Scaler (RobustScaler) tetap pakai yang lama, jadi fitur semua user tetap satu skala.
+#
+# Learning rate per centroid = 1 / jumlah user yang sudah masuk ke centroid itu
+# (aturan yang sama dengan sklearn), jadi centroid tetap rata-rata user anggotanya.
+
+
+class LabelDriftError(Exception):
+    pass
+
+
+def _nearest(centroids, X_scaled):
+    return np.argmin((centroids ** 2).sum(axis=1) - 2.0 * X_scaled @ centroids.T, axis=1)
+
+
+def _cluster_sums(labels, X_scaled, k):
+    sums = np.zeros((k, X_scaled.shape[1]))
+    np.add.at(sums, labels, X_scaled)
+    return np.bincount(labels, minlength=k), sums
+
+
+def remove_points(centroids, counts, X_scaled):
+    # Kontribusi vektor lama (user yang fiturnya berubah / sudah tidak ada) dikeluarkan dari
+    # centroid-nya. Label training asli user tidak disimpan, jadi vektor lama dianggap anggota
+    # centroid terdekat saat ini: pengurangannya perkiraan, bukan kebalikan persis dari fit
+    labels = _nearest(centroids, X_scaled)
+    n, sums = _cluster_sums(labels, X_scaled, len(centroids))
+    remaining = counts - n
+    keep = remaining > 0
+    centroids, counts = centroids.copy(), counts.astype(np.float64)
+    centroids[keep] = (centroids[keep] * counts[keep, None] - sums[keep]) / remaining[keep, None]
+    # Cluster yang habis anggotanya: count 0, jadi anggota baru pertama di partial_fit
+    # langsung jadi centroid-nya (bobot 1/1), bukan cuma menggeser centroid lama
+    counts[keep] = remaining[keep]
+    counts[~keep] = 0
+    return centroids, counts
+
+
+def partial_fit(centroids, counts, X_scaled, batch_size=1024, random_state=42):
+    # Sama dengan langkah MiniBatchKMeans: assign batch ke centroid terdekat, lalu
+    # centroid = (centroid * count_lama + jumlah anggota batch) / count_baru
+    centroids, counts = centroids.copy(), counts.astype(np.float64)
+    order = np.random.default_rng(random_state).permutation(len(X_scaled))
+    for start in range(0, len(order), batch_size):
+        batch = X_scaled[order[start:start + batch_size]]
+        n, sums = _cluster_sums(_nearest(centroids, batch), batch, len(centroids))
+        hit = n > 0
+        counts[hit] += n[hit]
+        centroids[hit] += (sums[hit] - n[hit, None] * centroids[hit]) / counts[hit, None]
+    return centroids, counts
+
+
+def match_labels(old_centroids, new_centroids):
+    # Hungarian matching centroid lama -> baru. order[i] = centroid baru yang
+    # menggantikan centroid lama i; drift[i] = jarak pergeserannya
+    cost = ((old_centroids[:, None, :] - new_centroids[None, :, :]) ** 2).sum(axis=2)
+    _, order = linear_sum_assignment(cost)
+    return order, np.sqrt(cost[np.arange(len(order)), order])
+
+
+def check_label_stability(old_centroids, new_centroids, max_drift=0.5):
+    # Label (Fast/Reflective/Consistent Learner) menempel ke id cluster. Setelah update:
+    #  - urutan centroid disesuaikan lagi dengan yang lama (kalau tertukar)
+    #  - kalau ada centroid yang geser lebih dari max_drift x jarak ke centroid lama
+    #    terdekat lainnya, arti cluster-nya sudah berubah -> perlu training ulang penuh
+    order, drift = match_labels(old_centroids, new_centroids)
+    gaps = np.sqrt(((old_centroids[:, None, :] - old_centroids[None, :, :]) ** 2).sum(axis=2))
+    np.fill_diagonal(gaps, np.inf)
+    limit = max_drift * gaps.min(axis=1)
+    unstable = np.flatnonzero(drift > limit)
+    if len(unstable):
+        details = ', '.join(f'cluster {i}: moved {drift[i]:.3f} (limit {limit[i]:.3f})' for i in unstable)
+        raise LabelDriftError(f"Centroids drifted too far for labels to stay valid ({details}); run a full retrain and re-check the labels.")
+    return order, drift
+
+
+def changed_users(df_old, df_new, features):
+    # User lama yang nilai fiturnya berubah, user baru, dan user lama yang tidak ada lagi di data baru
+    df_new = df_new[~df_new.index.duplicated(keep='last')]
+    common = df_new.index.intersection(df_old.index)
+    old_values = df_old.loc[common, features].fillna(0).to_numpy(dtype=np.float64)
+    new_values = df_new.loc[common, features].fillna(0).to_numpy(dtype=np.float64)
+    changed = common[~np.isclose(old_values, new_values, rtol=1e-12, atol=0).all(axis=1)]
+    added = df_new.index.difference(df_old.index)
+    removed = df_old.index.difference(df_new.index)
+    return changed, added, removed
+
+
+def update_bundle(bundle, df_old, df_new, batch_size=1024, max_drift=0.5):
+    # df_old: fitur terakhir yang dipakai model (feature store), df_new: fitur terbaru.
+    # Return (bundle baru, info) tanpa menyentuh scaler.
+    features = bundle.features
+    changed, added, removed = changed_users(df_old, df_new, features)
+
+    counts = bundle.counts
+    if counts is None:
+        # Bundle lama belum simpan ukuran cluster: hitung dari assignment fitur lama
+        X_old_all = bundle.transform(df_old.reindex(columns=features).fillna(0).to_numpy(dtype=np.float64))
+        counts = np.bincount(bundle.predict_scaled(X_old_all), minlength=len(bundle.centroids))
+
+    X_removed = bundle.transform(df_old.loc[changed.append(removed), features].fillna(0).to_numpy(dtype=np.float64))
+    X_updated = bundle.transform(df_new.loc[changed.append(added), features].fillna(0).to_numpy(dtype=np.float64))
+
+    centroids, counts = remove_points(bundle.centroids, counts, X_removed)
+    centroids, counts = partial_fit(centroids, counts, X_updated, batch_size)
+
+    order, drift = check_label_stability(bundle.centroids, centroids, max_drift)
+    updated = ModelBundle(features, bundle.center, bundle.scale, centroids[order], bundle.labels, counts=counts[order])
+    info = {
+        'changed_users': len(changed),
+        'new_users': len(added),
+        'removed_users': len(removed),
+        'relabelled': bool((order != np.arange(len(order))).any()),
+        'drift': pd.Series(drift, index=bundle.labels).round(4).to_dict(),
+    }
+    return updated, info
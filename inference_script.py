@@ -1,18 +1,26 @@
-import pandas as pd
-import joblib
+import numpy as np
 import os
-from ml_utils import perform_feature_engineering_final
+from datetime import datetime
+from fast_features import compute_user_features
+from model_bundle import load_bundle, BUNDLE_FILENAME
+from metrics import stage
 
-# Load Model
+# Jalur pandas (ml_utils, windowed_features, feature_store) baru di-import saat pertama
+# dipakai (batch / window / feature store), jadi start worker & jalur cepat /predict
+# tidak menanggung biaya import pandas.
+
+# Load Model (sekali saat startup; kalau gagal langsung error, bukan model None)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_DIR = os.path.join(BASE_DIR, 'models')
 
-try:
-    model = joblib.load(os.path.join(MODEL_DIR, 'kmeans_model.pkl'))
-    scaler = joblib.load(os.path.join(MODEL_DIR, 'scaler.pkl'))
-    features_list = joblib.load(os.path.join(MODEL_DIR, 'feature_list.pkl'))
-except:
-    model, scaler, features_list = None, None, []
+with stage('model_load'):
+    bundle = load_bundle(os.path.join(MODEL_DIR, BUNDLE_FILENAME))
+features_list = bundle.features
+
+# Fitur pendukung pesan insight (dibaca generate_insight_message), di luar fitur model
+INSIGHT_FEATURES = ['total_completed_tutorials', 'active_days', 'avg_submission_rating', 'avg_tutorial_duration']
+# Cuma fitur ini yang dihitung saat inference (fitur lain di registry, misal eksperimen, dilewati)
+required_features = list(dict.fromkeys(features_list + INSIGHT_FEATURES))
 
 # --- FUNGSI GENERATE INSIGHT (LOGIKA KAMU) ---
 def generate_insight_message(row, cluster_label):
@@ -49,39 +57,234 @@ def generate_insight_message(row, cluster_label):
         return "Belum ada aktivitas signifikan minggu ini. Yuk, mulai buka satu materi ringan hari ini!"
 
 
-def predict_user_category(raw_data_dict):
-    if not model: return {"error": "Model not loaded"}
+# Mapping Label (disimpan di model bundle, lihat DEFAULT_LABELS di model_bundle.py)
+labels_map = dict(enumerate(bundle.labels))
 
-    # 1. Masak Data
-    df_features = perform_feature_engineering_final(raw_data_dict)
-    if df_features.empty: return {"category": "Unknown", "message": "Data insufficient"}
 
-    # 2. Select Features
+# Ringkasan cluster (centroid dalam satuan fitur asli), dihitung sekali saat model di-load. Dipakai /clusters
+cluster_summary = {
+    "model_version": bundle.version,
+    "features": features_list,
+    "clusters": [
+        {
+            "cluster": i,
+            "label": label,
+            "centroid": dict(zip(features_list, bundle.centroids_original[i].tolist())),
+            "size": None if bundle.counts is None else int(bundle.counts[i]),
+        }
+        for i, label in enumerate(bundle.labels)
+    ],
+}
+
+
+def _score_features(df_features, explain=False):
+    # Select Features + Predict Cluster untuk semua baris sekaligus
     for c in features_list:
         if c not in df_features.columns: df_features[c] = 0
-            
+
     X = df_features[features_list].fillna(0)
+    # Scale + nearest centroid, masing-masing satu operasi NumPy
+    return (X,) + _predict(X.to_numpy(dtype='float64'), explain)
+
+
+def _predict(X, explain=False):
+    # Return (clusters, explanation); explanation None kalau explain=False
+    with stage('scale', rows_in=len(X)) as s:
+        X_scaled = bundle.transform(X)
+        s.rows_out = len(X_scaled)
+    with stage('predict', rows_in=len(X_scaled)) as s:
+        if explain:
+            explanation = bundle.explain_scaled(X_scaled)
+            clusters = explanation['clusters']
+        else:
+            explanation, clusters = None, bundle.predict_scaled(X_scaled)
+        s.rows_out = len(clusters)
+    return clusters, explanation
+
+
+def _explanation_row(explanation, i):
+    # Penjelasan satu baris hasil bundle.explain_scaled, dalam bentuk JSON
+    return {
+        "confidence": float(explanation['confidence'][i]),
+        "distances": dict(zip(bundle.labels, explanation['distances'][i].tolist())),
+        "memberships": dict(zip(bundle.labels, explanation['memberships'][i].tolist())),
+        "contributions": dict(zip(features_list, explanation['contributions'][i].tolist())),
+    }
+
+
+def predict_user_category(raw_data_dict, explain=False):
+    # explain=True: tambah jarak ke tiap centroid, confidence (soft assignment) dan
+    # kontribusi per fitur (scaled), dihitung di pass predict yang sama
+    from ml_utils import perform_feature_engineering_final
+    # 1. Masak Data
+    df_features = perform_feature_engineering_final(raw_data_dict, required_features)
+    if df_features.empty: return {"category": "Unknown", "message": "Data insufficient"}
+
+    # 2. Select Features & 3. Predict Cluster
+    X, clusters, explanation = _score_features(df_features, explain)
+    cluster = clusters[0]
     
-    # 3. Predict Cluster
-    X_scaled = scaler.transform(X)
-    cluster = model.predict(X_scaled)[0]
-    
-    # 4. Mapping Label (Pastikan mapping ini sesuai hasil trainingmu!)
-    # Tips: Nanti pas training, cek dulu cluster 0 itu karakternya apa, baru update dict ini.
-    labels_map = {0: "Fast Learner", 1: "Reflective Learner", 2: "Consistent Learner"}
+    # 4. Mapping Label
     result_label = labels_map.get(cluster, "Unknown")
     
     # 5. Generate Insight Message (Panggil fungsi di atas)
     # Kita ambil row pertama (karena prediksi per user)
     user_row = df_features.iloc[0]
-    final_message = generate_insight_message(user_row, result_label)
+    with stage('insight', rows_in=1):
+        final_message = generate_insight_message(user_row, result_label)
     
-    return {
+    result = {
         "user_id": int(df_features.index[0]),
         "category": result_label,
         "insight_message": final_message,
-        "metrics": df_features[features_list].to_dict('records')[0]
+        "metrics": X.to_dict('records')[0]
     }
+    if explain: result["explanation"] = _explanation_row(explanation, 0)
+    return result
+
+
+def predict_user_category_fast(tables, explain=False):
+    # Sama dengan predict_user_category, tapi input list of dict (body request) dan
+    # fiturnya dihitung tanpa pandas (lihat fast_features.py). Dipakai /predict.
+    return predict_user_categories_fast([tables], explain)[0]
+
+
+def predict_user_categories_fast(tables_list, explain=False):
+    # Banyak request /predict sekaligus (micro-batch): fitur tiap request dihitung
+    # sendiri-sendiri, lalu scale + predict cukup satu kali untuk semua baris.
+    # Hasil per request sama persis dengan predict_user_category_fast.
+    with stage('fast_features', rows_in=len(tables_list)) as s:
+        computed = [compute_user_features(tables, required_features) for tables in tables_list]
+        s.rows_out = sum(1 for user_id, _ in computed if user_id is not None)
+    results = [{"category": "Unknown", "message": "Data insufficient"} for _ in tables_list]
+
+    scored = [i for i, (user_id, _) in enumerate(computed) if user_id is not None]
+    if not scored: return results
+
+    X = np.array([[computed[i][1].get(c, 0) for c in features_list] for i in scored], dtype=np.float64)
+    clusters, explanation = _predict(X, explain)
+
+    with stage('insight', rows_in=len(scored)):
+        for row, (i, cluster) in enumerate(zip(scored, clusters)):
+            user_id, features = computed[i]
+            result_label = labels_map.get(cluster, "Unknown")
+            results[i] = {
+                "user_id": int(user_id),
+                "category": result_label,
+                "insight_message": generate_insight_message(features, result_label),
+                "metrics": {c: features.get(c, 0) for c in features_list}
+            }
+            if explain: results[i]["explanation"] = _explanation_row(explanation, row)
+    return results
+
+
+def _build_results(df_features, explain=False):
+    X, clusters, explanation = _score_features(df_features, explain)
+
+    # to_dict sekali di luar loop, jauh lebih murah daripada iloc per baris
+    rows = df_features.to_dict('records')
+    metrics = X.to_dict('records')
+
+    results = []
+    with stage('insight', rows_in=len(rows)):
+        for i, (user_id, row, cluster, user_metrics) in enumerate(zip(df_features.index, rows, clusters, metrics)):
+            result_label = labels_map.get(cluster, "Unknown")
+            results.append({
+                "user_id": int(user_id),
+                "category": result_label,
+                "insight_message": generate_insight_message(row, result_label),
+                "metrics": user_metrics
+            })
+            if explain: results[-1]["explanation"] = _explanation_row(explanation, i)
+    return results
+
+
+def predict_users_batch(raw_data_dict, explain=False):
+    # Versi batch: feature engineering, scaler & model cuma jalan sekali buat semua user
+    from ml_utils import perform_feature_engineering_final
+    df_features = perform_feature_engineering_final(raw_data_dict, required_features)
+    if df_features.empty: return []
+
+    return _build_results(df_features, explain)
+
+
+def predict_users_batch_tables(tables, explain=False):
+    # Versi list of dict (body request), dipakai worker pool /predict_batch
+    import pandas as pd
+    return predict_users_batch({k: pd.DataFrame(v) for k, v in tables.items()}, explain)
+
+
+def predict_users_windowed(raw_data_dict, cutoffs=None, window=None):
+    # Prediksi per (user, window waktu): fitur semua window dihitung sekali jalan
+    # (lihat windowed_features.py), lalu scale + predict satu kali untuk semua baris
+    from windowed_features import perform_feature_engineering_windowed
+    df_features = perform_feature_engineering_windowed(raw_data_dict, cutoffs, window)
+    if df_features.empty: return []
+
+    cutoffs = df_features.index.get_level_values('cutoff')
+    results = _build_results(df_features.reset_index(level='cutoff', drop=True))
+    for result, cutoff in zip(results, cutoffs):
+        result["cutoff"] = cutoff.isoformat()
+    return results
+
+
+def predict_users_windowed_tables(tables, cutoffs=None, window=None):
+    # Versi list of dict (body request), dipakai worker pool /predict_windows
+    import pandas as pd
+    return predict_users_windowed({k: pd.DataFrame(v) for k, v in tables.items()}, cutoffs, window)
+
+
+# --- WARM-UP ---
+# Satu user sintetis (format body /predict) yang menyentuh semua tabel, dipakai
+# saat startup supaya request pertama tidak kena jalur yang masih dingin
+WARMUP_TABLES = {
+    "users": [{"id": 1, "created_at": datetime(2023, 1, 1, 8)}],
+    "trackings": [
+        {"developer_id": 1, "tutorial_id": 1, "status": "completed", "last_viewed": datetime(2023, 1, 2, 9, 30),
+         "first_opened_at": datetime(2023, 1, 2, 9), "completed_at": datetime(2023, 1, 2, 9, 30)},
+    ],
+    "submissions": [
+        {"id": 1, "submitter_id": 1, "quiz_id": 1, "status": 1, "created_at": datetime(2023, 1, 3, 10),
+         "ended_review_at": datetime(2023, 1, 3, 12), "rating": 4.0},
+    ],
+    "exam_registrations": [
+        {"id": 1, "examinees_id": 1, "created_at": datetime(2023, 1, 4, 9),
+         "deadline_at": datetime(2023, 1, 4, 11), "exam_finished_at": datetime(2023, 1, 4, 10)},
+    ],
+    "exam_results": [{"exam_registration_id": 1, "score": 80.0, "total_questions": 10}],
+}
+
+
+def warm_up():
+    # Prediksi sintetis lewat jalur /predict; gagal = error keras (jangan dilaporkan ready)
+    result = predict_user_category_fast(WARMUP_TABLES, True)
+    if result.get("category") not in bundle.labels:
+        raise RuntimeError(f"Warm-up prediction failed: {result}")
+    return result
+
+
+# --- FEATURE STORE ---
+# Fitur yang sudah dihitung sebelumnya (train.py --feature-store / update_feature_store),
+# jadi gak perlu masak ulang dari raw event.
+_feature_store = None
+_feature_store_mtime = None
+
+def _get_feature_store():
+    global _feature_store, _feature_store_mtime
+    from feature_store import FeatureStore, FEATURE_STORE_DIR
+    # Buka ulang kalau store baru saja di-update (meta.json ditulis terakhir)
+    mtime = os.path.getmtime(os.path.join(FEATURE_STORE_DIR, 'meta.json'))
+    if _feature_store is None or mtime != _feature_store_mtime:
+        _feature_store = FeatureStore(FEATURE_STORE_DIR)
+        _feature_store_mtime = mtime
+    return _feature_store
+
+
+def predict_from_feature_store(developer_ids, explain=False):
+    df_features = _get_feature_store().get_many(developer_ids)
+    if df_features.empty: return []
+
+    return _build_results(df_features, explain)
 
 if __name__ == "__main__":
     print("Inference script ready.")
@@ -1,43 +1,214 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-import pandas as pd
-import joblib
-import os
-# Kita import fungsi dari inference_script yang udah kita buat sebelumnya
-from inference_script import predict_user_category
+import time
+# Waktu import modul ini (startup worker), dilaporkan di /ready & /metrics
+_import_start = time.perf_counter()
 
-app = FastAPI()
+import asyncio
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
+from pydantic import BaseModel, field_validator
+from typing import List, Optional, Union
+from datetime import datetime, timedelta
+# Kita import fungsi dari inference_script yang udah kita buat sebelumnya.
+# pandas / pyarrow tidak di-import di sini: jalur batch, window & stream meng-import-nya
+# saat pertama dipakai, jadi start worker (dan /predict) tidak menanggung biayanya.
+from inference_script import predict_user_category_fast, predict_user_categories_fast, predict_users_batch, predict_users_batch_tables, predict_users_windowed_tables, predict_from_feature_store, cluster_summary, warm_up, bundle
+from worker_pool import BoundedPool, PoolSaturated
+from result_cache import ResultCache
+from micro_batch import MicroBatcher, PREDICT_BATCH_WINDOW_MS
+import metrics
+
+# Pool untuk kerjaan CPU (lihat worker_pool.py untuk konfigurasi lewat env)
+predict_pool = BoundedPool()
+# Cache hasil /predict (lihat result_cache.py), key terikat ke isi model yang di-load
+result_cache = ResultCache(bundle.fingerprint)
+# Micro-batching /predict (opsional, aktif kalau PREDICT_BATCH_WINDOW_MS > 0, lihat micro_batch.py)
+micro_batcher = None
+if PREDICT_BATCH_WINDOW_MS > 0:
+    micro_batcher = MicroBatcher(lambda tables_list: predict_pool.run(predict_user_categories_fast, tables_list))
+
+# Gauge yang dibaca saat /metrics di-scrape
+metrics.REGISTRY.register(metrics.Gauge('predict_pool_in_flight', 'Requests running or queued on the worker pool', fn=lambda: predict_pool.in_flight))
+metrics.REGISTRY.register(metrics.Gauge('predict_pool_queue_depth', 'Requests waiting for a worker', fn=lambda: predict_pool.queue_depth))
+metrics.REGISTRY.register(metrics.Gauge('predict_cache_entries', 'Entries in the /predict result cache', fn=lambda: result_cache.stats()['size']))
+
+# Status startup: ready baru True setelah warm-up selesai
+startup = {"ready": False, "import_seconds": time.perf_counter() - _import_start, "warmup_seconds": None}
+metrics.REGISTRY.register(metrics.Gauge('startup_import_seconds', 'Time to import the app module', fn=lambda: startup['import_seconds']))
+metrics.REGISTRY.register(metrics.Gauge('startup_warmup_seconds', 'Time spent in the startup warm-up', fn=lambda: startup['warmup_seconds'] or 0.0))
+metrics.REGISTRY.register(metrics.Gauge('ready', '1 once warm-up finished and the app accepts traffic', fn=lambda: float(startup['ready'])))
+
+async def _warm_up():
+    # Prediksi sintetis di process ini lalu di tiap worker pool (sekaligus memaksa worker
+    # process di-spawn sekarang), jadi request pertama tidak kena jalur yang masih dingin
+    start = time.perf_counter()
+    warm_up()
+    await asyncio.gather(*(predict_pool.run(warm_up) for _ in range(predict_pool.workers)))
+    startup['warmup_seconds'] = time.perf_counter() - start
+    startup['ready'] = True
+
+@asynccontextmanager
+async def lifespan(app):
+    await _warm_up()
+    yield
+    startup['ready'] = False
+    predict_pool.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Pakai template route (/predict/{developer_id}), bukan path asli, biar label gak meledak
+        route = request.scope.get('route')
+        path = route.path if route is not None else 'unmatched'
+        metrics.observe_request(request.method, path, status, time.perf_counter() - start)
+
+def _on_tables(fn, data, *args):
+    # Jalan di worker pool: model_dump (dan DataFrame di dalam fn) ikut dikerjakan worker,
+    # jadi batch besar tidak mem-block event loop sebelum masuk pool
+    return fn(data.to_tables(), *args)
+
+def _predict_inputs(data, body):
+    # Di thread (bukan event loop): dump body ke list of dict + key cache dari bytes body mentah
+    return data.to_tables(), (result_cache.key(body) if body is not None else None)
+
+def _busy_error(e):
+    # Pool penuh: tolak cepat, backend bisa retry / kurangi concurrency
+    return HTTPException(
+        status_code=503,
+        detail=f"Server busy, {e.queue_depth} requests queued. Try again later.",
+        headers={"Retry-After": "1", "X-Queue-Depth": str(e.queue_depth)}
+    )
+
+# Row Schema: cuma kolom yang dipakai fitur. Tanggal di-parse sekali di sini
+# (ISO 8601 / 'YYYY-MM-DD HH:MM:SS'), payload yang salah format langsung 422.
+class Row(BaseModel):
+    @field_validator('*', mode='before')
+    @classmethod
+    def empty_string_to_none(cls, v):
+        # String kosong dianggap null (dulu jadi NaT di pd.to_datetime)
+        return None if v == '' else v
+
+    @field_validator('*')
+    @classmethod
+    def drop_timezone(cls, v):
+        # Simpan jam lokal sesuai offset yang dikirim, sama seperti perilaku pandas sebelumnya
+        return v.replace(tzinfo=None) if isinstance(v, datetime) else v
+
+class UserRow(Row):
+    id: int
+    created_at: Optional[datetime] = None
+
+    @field_validator('created_at', mode='wrap')
+    @classmethod
+    def lenient_created_at(cls, v, handler):
+        # Tidak dipakai fitur manapun: format aneh jadi null (seperti pd.to_datetime errors='coerce'),
+        # bukan 422 untuk payload yang selain itu valid
+        try:
+            return handler(v)
+        except ValueError:
+            return None
+
+class TrackingRow(Row):
+    developer_id: int
+    tutorial_id: Optional[int] = None
+    status: Optional[Union[int, str]] = None
+    last_viewed: Optional[datetime] = None
+    first_opened_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+class SubmissionRow(Row):
+    id: int
+    submitter_id: int
+    quiz_id: Optional[int] = None
+    status: Optional[int] = None
+    created_at: Optional[datetime] = None
+    ended_review_at: Optional[datetime] = None
+    rating: Optional[float] = None
+
+class ExamRegistrationRow(Row):
+    id: int
+    examinees_id: int
+    created_at: Optional[datetime] = None
+    deadline_at: Optional[datetime] = None
+    exam_finished_at: Optional[datetime] = None
+
+class ExamResultRow(Row):
+    exam_registration_id: int
+    score: Optional[float] = None
+    total_questions: Optional[int] = None
 
 # Input Schema (Sesuai dengan data mentah yang dikirim Backend)
+# completions, journeys & tutorials tidak dipakai fitur manapun, jadi diabaikan
+# (field yang tidak dikenal di-drop saat validasi).
 class InputData(BaseModel):
-    users: list = []
-    trackings: list = []
-    submissions: list = []
-    completions: list = []
-    journeys: list = []
-    tutorials: list = []
-    exam_registrations: list = []
-    exam_results: list = []
+    users: List[UserRow] = []
+    trackings: List[TrackingRow] = []
+    submissions: List[SubmissionRow] = []
+    exam_registrations: List[ExamRegistrationRow] = []
+    exam_results: List[ExamResultRow] = []
+
+    def to_tables(self):
+        tables = self.model_dump()
+        # Kalau backend sama sekali tidak kirim status tracking, ml_utils pakai
+        # completed_at sebagai penanda selesai, jadi kolomnya jangan dibuat.
+        if not any('status' in t.model_fields_set for t in self.trackings):
+            for row in tables['trackings']: row.pop('status', None)
+        return tables
+
+# Input /predict_windows: data mentah + tanggal cutoff dan/atau ukuran window (hari)
+class WindowedInputData(InputData):
+    cutoffs: List[datetime] = []
+    window_days: Optional[float] = None
+
+    @field_validator('cutoffs')
+    @classmethod
+    def drop_cutoff_timezone(cls, v):
+        return [c.replace(tzinfo=None) for c in v]
+
+    @field_validator('window_days')
+    @classmethod
+    def positive_window(cls, v):
+        if v is not None and v <= 0:
+            raise ValueError('window_days must be positive')
+        return v
+
+    def to_tables(self):
+        tables = super().to_tables()
+        tables.pop('cutoffs'); tables.pop('window_days')
+        return tables
 
 @app.get("/")
 def home():
     return {"message": "AI Learning Insight API is Running! Send POST to /predict"}
 
 @app.post("/predict")
-def predict_endpoint(data: InputData):
+async def predict_endpoint(data: InputData, request: Request, explain: bool = False):
     try:
-        # 1. Konversi JSON Input ke Dictionary of DataFrames
-        # (Format ini yang dimengerti oleh inference_script kita)
-        raw_data = {k: pd.DataFrame(v) for k, v in data.dict().items()}
-        
-        # 2. Panggil Fungsi Prediksi Utama
-        # Fungsi ini ada di inference_script.py, dia yang handle feature engineering + predict + insight message
-        result = predict_user_category(raw_data)
-        
-        # 3. Cek Error dari fungsi prediksi
-        if "error" in result:
-            # Kalau model gak ke-load atau error lain
-            raise HTTPException(status_code=500, detail=result["error"])
+        # 1. Panggil Fungsi Prediksi Utama (jalur cepat satu user, langsung dari list of dict
+        # tanpa bikin DataFrame). Fungsi ini ada di inference_script.py, dia yang handle
+        # feature engineering + predict + insight message. Jalan di worker pool.
+        # ?explain=true: tambah jarak ke centroid, confidence & kontribusi fitur (tanpa cache / micro-batch)
+        # Dump body + hash key cache di thread (dua-duanya perlu di sini untuk cache / micro-batch).
+        # request.body() cuma ambil bytes yang sudah dibaca FastAPI waktu parse InputData
+        body = await request.body() if result_cache.enabled and not explain else None
+        tables, cache_key = await asyncio.to_thread(_predict_inputs, data, body)
+        result = result_cache.get(cache_key) if cache_key else None
+        if result is None:
+            if explain:
+                result = await predict_pool.run(predict_user_category_fast, tables, True)
+            elif micro_batcher is not None:
+                result = await micro_batcher.submit(tables)
+            else:
+                result = await predict_pool.run(predict_user_category_fast, tables)
+            if cache_key: result_cache.put(cache_key, result)
         
         if result.get("category") == "Unknown" and result.get("message") == "Data insufficient":
              # Kalau data user gak cukup (misal user baru banget daftar)
@@ -50,9 +221,116 @@ def predict_endpoint(data: InputData):
             
         return result
 
+    except PoolSaturated as e:
+        raise _busy_error(e)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
 
+@app.post("/predict_batch")
+async def predict_batch_endpoint(data: InputData, explain: bool = False):
+    # Sama seperti /predict, tapi tabelnya boleh berisi banyak user sekaligus.
+    # Hasilnya satu entry per developer_id (urutan ikut tabel users).
+    try:
+        results = await predict_pool.run(_on_tables, predict_users_batch_tables, data, explain)
+
+        return {"count": len(results), "results": results}
+
+    except PoolSaturated as e:
+        raise _busy_error(e)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+@app.post("/predict_batch/stream")
+async def predict_batch_stream_endpoint(request: Request, explain: bool = False):
+    # Sama seperti /predict_batch, tapi body berupa stream Arrow IPC / NDJSON per tabel
+    # (lihat stream_ingest.py): di-decode langsung ke kolom sambil body masih diterima,
+    # tanpa parsing JSON + validasi per baris
+    from stream_ingest import read_request_tables, StreamFormatError, ARROW_STREAM_TYPE, NDJSON_TYPE
+    content_type = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    if content_type not in (ARROW_STREAM_TYPE, NDJSON_TYPE):
+        raise HTTPException(status_code=415, detail=f"Content-Type must be {ARROW_STREAM_TYPE} or {NDJSON_TYPE}")
+    try:
+        # Satu slot pool untuk decode + predict: upload besar yang berbarengan ikut antre /
+        # ditolak 503 (slot diambil sebelum body dibaca), bukan decode paralel tanpa batas
+        async with predict_pool.slot():
+            try:
+                tables = await read_request_tables(request.stream(), content_type)
+            except StreamFormatError as e:
+                raise HTTPException(status_code=422, detail=str(e))
+            results = await predict_pool.execute(predict_users_batch, tables, explain)
+
+        return {"count": len(results), "results": results}
+
+    except PoolSaturated as e:
+        raise _busy_error(e)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+@app.post("/predict_windows")
+async def predict_windows_endpoint(data: WindowedInputData):
+    # Kategori tiap user di banyak window waktu sekaligus (misal tren mingguan).
+    # Satu entry per (developer_id, cutoff); window = event di [cutoff - window_days, cutoff),
+    # tanpa window_days = kumulatif s/d cutoff, tanpa cutoffs = rolling window menutupi semua data.
+    # Batas jumlah window & ukuran window minimum: lihat MAX_WINDOWS / MIN_WINDOW_HOURS di windowed_features.py
+    from windowed_features import WindowLimitError
+    if not data.cutoffs and data.window_days is None:
+        raise HTTPException(status_code=422, detail="Send cutoffs, window_days, or both")
+    try:
+        window = timedelta(days=data.window_days) if data.window_days is not None else None
+        results = await predict_pool.run(_on_tables, predict_users_windowed_tables, data, data.cutoffs or None, window)
+
+        return {"count": len(results), "results": results}
+
+    except WindowLimitError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except PoolSaturated as e:
+        raise _busy_error(e)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Internal Server Error: {str(e)}")
+
+@app.get("/ready")
+def ready_endpoint():
+    # Readiness probe: 503 sampai warm-up selesai (dan lagi saat shutdown)
+    return JSONResponse(
+        status_code=200 if startup['ready'] else 503,
+        content={"status": "ready" if startup['ready'] else "starting", "model_version": bundle.version, **startup}
+    )
+
+@app.get("/cache/stats")
+def cache_stats_endpoint():
+    return result_cache.stats()
+
+@app.get("/metrics")
+def metrics_endpoint():
+    # Format Prometheus; stage pipeline hanya terisi kalau PIPELINE_METRICS=1
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/clusters")
+def clusters_endpoint():
+    # Centroid tiap cluster dalam satuan fitur asli (sudah dihitung saat model di-load)
+    return cluster_summary
+
+@app.get("/predict/{developer_id}")
+def predict_stored_endpoint(developer_id: int, explain: bool = False):
+    # Prediksi dari feature store (fitur sudah dihitung sebelumnya), tanpa kirim raw data
+    try:
+        results = predict_from_feature_store([developer_id], explain)
+    except FileNotFoundError:
+        raise HTTPException(status_code=503, detail="Feature store not available")
+
+    if not results:
+        raise HTTPException(status_code=404, detail=f"User {developer_id} not found in feature store")
+
+    return results[0]
+
 # Blok ini biar bisa dijalankan lokal pakai 'python main.py'
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,234 @@
+import os
+import time
+import bisect
+import threading
+import tracemalloc
+
+# Metrics sederhana format Prometheus (text exposition), tanpa dependency tambahan.
+#
+# Latency request HTTP selalu dicatat (murah). Instrumentasi per-stage pipeline
+# (feature engineering & inference) opt-in lewat env:
+#   PIPELINE_METRICS        : 1 = catat waktu + jumlah baris masuk/keluar tiap stage
+#   PIPELINE_METRICS_MEMORY : 1 = juga catat peak memory tiap stage (tracemalloc, jauh lebih lambat)
+PIPELINE_METRICS = os.getenv('PIPELINE_METRICS', '0') == '1'
+PIPELINE_METRICS_MEMORY = os.getenv('PIPELINE_METRICS_MEMORY', '0') == '1'
+
+# Bucket latency request (detik) & durasi stage (stage bisa cuma beberapa mikrodetik)
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (1e-5, 1e-4, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0, 120.0)
+
+
+def _label_str(names, values):
+    if not names: return ''
+    pairs = ','.join(f'{n}="{str(v)}"' for n, v in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class _Metric:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+
+class Counter(_Metric):
+    type = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name, help_text, labels)
+        self.values = {}
+
+    def inc(self, amount=1, *label_values):
+        with self._lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self):
+        for label_values, value in sorted(self.values.items()):
+            yield self.name, _label_str(self.labels, label_values), value
+
+
+class Gauge(_Metric):
+    type = 'gauge'
+
+    def __init__(self, name, help_text, labels=(), fn=None):
+        super().__init__(name, help_text, labels)
+        self.values = {}
+        self.fn = fn  # Kalau diisi, nilai diambil saat scrape (tanpa label)
+
+    def set(self, value, *label_values):
+        with self._lock:
+            self.values[label_values] = value
+
+    def set_max(self, value, *label_values):
+        with self._lock:
+            self.values[label_values] = max(value, self.values.get(label_values, value))
+
+    def samples(self):
+        if self.fn is not None:
+            yield self.name, '', self.fn()
+            return
+        for label_values, value in sorted(self.values.items()):
+            yield self.name, _label_str(self.labels, label_values), value
+
+
+class Histogram(_Metric):
+    type = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=REQUEST_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}  # label_values -> [counts per bucket..., sum, count]
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            state = self.values.get(label_values)
+            if state is None:
+                state = self.values[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets): state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def samples(self):
+        for label_values, state in sorted(self.values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                yield f'{self.name}_bucket', _label_str(self.labels + ('le',), label_values + (repr(bound),)), cumulative
+            yield f'{self.name}_bucket', _label_str(self.labels + ('le',), label_values + ('+Inf',)), state[-1]
+            yield f'{self.name}_sum', _label_str(self.labels, label_values), state[-2]
+            yield f'{self.name}_count', _label_str(self.labels, label_values), state[-1]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+http_requests = REGISTRY.register(Counter(
+    'http_requests_total', 'HTTP requests by route and status code', ('method', 'path', 'status')))
+http_latency = REGISTRY.register(Histogram(
+    'http_request_duration_seconds', 'HTTP request latency', ('method', 'path'), REQUEST_BUCKETS))
+stage_latency = REGISTRY.register(Histogram(
+    'pipeline_stage_duration_seconds', 'Wall time per pipeline stage', ('stage',), STAGE_BUCKETS))
+stage_rows_in = REGISTRY.register(Counter(
+    'pipeline_stage_rows_in_total', 'Rows entering each pipeline stage', ('stage',)))
+stage_rows_out = REGISTRY.register(Counter(
+    'pipeline_stage_rows_out_total', 'Rows produced by each pipeline stage', ('stage',)))
+stage_peak_memory = REGISTRY.register(Gauge(
+    'pipeline_stage_peak_memory_bytes', 'Max peak allocated memory seen per stage (tracemalloc)', ('stage',)))
+
+
+def observe_request(method, path, status, seconds):
+    http_requests.inc(1, method, path, status)
+    http_latency.observe(seconds, method, path)
+
+
+# --- STAGE INSTRUMENTATION ---
+# Worker process (PREDICT_EXECUTOR=process) punya registry sendiri, jadi observasi
+# stage di worker dikumpulkan (collect) lalu diputar ulang di process utama (replay).
+_local = threading.local()
+
+
+def _record(stage_name, seconds, rows_in, rows_out, peak_bytes):
+    sink = getattr(_local, 'sink', None)
+    if sink is not None:
+        sink.append((stage_name, seconds, rows_in, rows_out, peak_bytes))
+        return
+    stage_latency.observe(seconds, stage_name)
+    if rows_in is not None: stage_rows_in.inc(rows_in, stage_name)
+    if rows_out is not None: stage_rows_out.inc(rows_out, stage_name)
+    if peak_bytes is not None: stage_peak_memory.set_max(peak_bytes, stage_name)
+
+
+def replay(observations):
+    for observation in observations or ():
+        _record(*observation)
+
+
+def collect(fn, *args):
+    # Jalankan fn sambil menampung observasi stage-nya; return (hasil, observasi)
+    if not PIPELINE_METRICS:
+        return fn(*args), None
+    previous = getattr(_local, 'sink', None)
+    _local.sink = []
+    try:
+        return fn(*args), _local.sink
+    finally:
+        _local.sink = previous
+
+
+class _NoopStage:
+    rows_out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NOOP_STAGE = _NoopStage()
+
+
+class _Stage:
+    def __init__(self, name, rows_in):
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+
+    def __enter__(self):
+        if PIPELINE_METRICS_MEMORY:
+            if not tracemalloc.is_tracing(): tracemalloc.start()
+            # reset_peak global: peak stage luar diselamatkan dulu sebelum di-reset
+            stack = _local.__dict__.setdefault('stack', [])
+            current, peak = tracemalloc.get_traced_memory()
+            for outer in stack: outer.peak = max(outer.peak, peak)
+            tracemalloc.reset_peak()
+            self.base = self.peak = current
+            stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        peak_bytes = None
+        if PIPELINE_METRICS_MEMORY:
+            stack = _local.stack
+            stack.pop()
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            for outer in stack: outer.peak = max(outer.peak, self.peak)
+            peak_bytes = self.peak - self.base
+        _record(self.name, seconds, self.rows_in, self.rows_out, peak_bytes)
+        return False
+
+
+def stage(name, rows_in=None):
+    # Pemakaian:
+    #   with stage('trackings_partial', rows_in=len(df_t)) as s:
+    #       ...
+    #       s.rows_out = len(hasil)
+    # Kalau PIPELINE_METRICS mati, ini no-op (hampir tanpa overhead).
+    if not PIPELINE_METRICS:
+        return _NOOP_STAGE
+    return _Stage(name, rows_in)
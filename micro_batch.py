@@ -0,0 +1,56 @@
+import os
+import asyncio
+
+# Micro-batching untuk /predict: request yang datang dalam jendela waktu pendek
+# (atau sampai N request) digabung jadi satu kerjaan di worker pool dan satu
+# matrix predict, lalu tiap caller dapat hasilnya masing-masing.
+#
+#   PREDICT_BATCH_WINDOW_MS : lama jendela tunggu (0 = micro-batching mati)
+#   PREDICT_BATCH_MAX       : maksimal request per batch (batch langsung jalan kalau penuh)
+PREDICT_BATCH_WINDOW_MS = float(os.getenv('PREDICT_BATCH_WINDOW_MS', 0))
+PREDICT_BATCH_MAX = int(os.getenv('PREDICT_BATCH_MAX', 32))
+
+
+class MicroBatcher:
+    # run_batch: async fn(list item) -> list hasil (urutan sama). Dipakai dari event loop saja.
+    def __init__(self, run_batch, window_ms=PREDICT_BATCH_WINDOW_MS, max_batch=PREDICT_BATCH_MAX):
+        self.run_batch = run_batch
+        self.window = window_ms / 1000
+        self.max_batch = max(1, max_batch)
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch: return
+
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        try:
+            results = await self.run_batch([item for item, _ in batch])
+        except Exception as e:
+            # Error (misal pool penuh -> 503) diteruskan ke semua caller di batch ini
+            for _, future in batch:
+                if not future.done(): future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done(): future.set_result(result)
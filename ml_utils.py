@@ -1,356 +1,600 @@
 import pandas as pd
 import numpy as np
 from datetime import timedelta
+from metrics import stage
+from feature_registry import register, evaluate, group_of, required_columns
+# Konstanta kolom & fitur ada di feature_schema (ringan), di-export ulang dari sini
+from feature_schema import (
+    TRACKING_COLUMNS, SUBMISSION_COLUMNS, EXAM_REGISTRATION_COLUMNS, EXAM_RESULT_COLUMNS, USER_COLUMNS,
+    FEATURE_COLUMNS, EXAM_FEATURES, TRACKING_FEATURES, SUBMISSION_FEATURES, ALL_FEATURES,
+    DATE_COLUMNS, TABLE_INPUTS, ID_COLUMNS,
+)
 
-def perform_feature_engineering_final(dfs):
-    # --- 0. PREPARATION ---
-    required_tables = ['users', 'exam_results', 'exam_registrations', 'submissions', 'trackings', 'completions', 'journeys', 'tutorials']
-    for tbl in required_tables:
-        if tbl not in dfs: dfs[tbl] = pd.DataFrame()
+# Id disimpan int32 kalau muat
+INT32_RANGE = (np.iinfo(np.int32).min, np.iinfo(np.int32).max)
 
-    # Helper DateTime
-    def to_dt(df, cols):
-        for c in cols:
-            if c in df.columns: df[c] = pd.to_datetime(df[c], errors='coerce')
-        return df
 
-    if not dfs['exam_registrations'].empty:
-        dfs['exam_registrations'] = to_dt(dfs['exam_registrations'], ['created_at', 'deadline_at', 'exam_finished_at'])
-    if not dfs['submissions'].empty:
-        dfs['submissions'] = to_dt(dfs['submissions'], ['created_at', 'ended_review_at'])
-    if not dfs['trackings'].empty:
-        dfs['trackings'] = to_dt(dfs['trackings'], ['last_viewed', 'first_opened_at', 'completed_at'])
+# Helper DateTime
+def to_dt(df, cols):
+    for c in cols:
+        if c in df.columns: df[c] = pd.to_datetime(df[c], errors='coerce')
+    return df
+
+
+def _compact_ids(col):
+    if pd.api.types.is_integer_dtype(col) and len(col) and col.min() >= INT32_RANGE[0] and col.max() <= INT32_RANGE[1]:
+        return col.astype(np.int32)
+    return col
+
+
+def _compact_status(col):
+    # Status tracking (string) -> category, status submission (angka) -> int kecil
+    if pd.api.types.is_integer_dtype(col):
+        return pd.to_numeric(col, downcast='integer')
+    if col.dtype == object:
+        return col.astype('category')
+    return col
+
+
+def normalize_table(df, table, columns=None):
+    # Tahap awal pipeline: ambil kolom yang dipakai fitur saja (bukan copy seluruh tabel),
+    # tanggal -> datetime64, id -> int32, status -> category / int kecil.
+    # columns: subset kolom yang dibutuhkan (default semua kolom fitur tabel ini)
+    columns = [c for c in FEATURE_COLUMNS.get(table, df.columns) if c in df.columns and (columns is None or c in columns)]
+    date_columns = DATE_COLUMNS.get(table, [])
+    normalized = {}
+    for c in columns:
+        col = df[c]
+        if c in date_columns: col = pd.to_datetime(col, errors='coerce')
+        elif c in ID_COLUMNS: col = _compact_ids(col)
+        elif c == 'status': col = _compact_status(col)
+        normalized[c] = col
+    return pd.DataFrame(normalized, index=df.index)
+
+
+# =====================================================================
+# PARTIAL AGGREGATES
+# Semua fitur dihitung lewat agregat per developer yang bisa digabung
+# (sum, count, min/max, set hari/tutorial unik). Mode biasa = satu partial
+# dari seluruh tabel; mode chunked = gabungan partial per chunk; feature
+# store = partial tersimpan + partial dari event baru.
+#
+# Bagian partial, intermediate bersama & fitur adalah node di feature_registry
+# (@register): cuma node yang dibutuhkan fitur yang diminta yang dihitung.
+# =====================================================================
+
+# Bagian tiap partial, masing-masing node '<tabel>.<bagian>'
+PARTIAL_NODES = {
+    'exams': ['stats', 'registrations'],
+    'submissions': ['stats', 'quizzes'],
+    'trackings': ['stats', 'days', 'tutorials'],
+}
+
+
+def _evaluate_partial(table, inputs):
+    values = evaluate([f'{table}.{part}' for part in PARTIAL_NODES[table]], inputs)
+    return {part: values[f'{table}.{part}'] for part in PARTIAL_NODES[table]}
+
+
+def _partial_context(table, partial):
+    # Partial yang sudah ada (feature store / chunk) jadi input evaluate()
+    return {f'{table}.{part}': value for part, value in partial.items()}
+
+
+@register('trackings.is_done', depends=['trackings'], columns={'trackings': ['status', 'completed_at']})
+def _is_completed(df_t):
+    # Filter Completed Only
+    # Regex cukup dijalankan di nilai status yang unik (biasanya cuma segelintir), bukan per baris
+    if 'status' in df_t.columns:
+        status_codes, status_uniques = pd.factorize(df_t['status'])
+        unique_done = pd.Series(status_uniques).astype(str).str.contains('completed|passed|1', case=False, regex=True).to_numpy()
+        # Code -1 (status kosong) jatuh ke elemen terakhir = False
+        unique_done = np.append(unique_done.astype(bool), False)
+        return pd.Series(unique_done[status_codes], index=df_t.index)
+    return df_t['completed_at'].notna()
+
+
+def trackings_partial(df_t):
+    with stage('trackings_partial', rows_in=len(df_t)) as s:
+        partial = _trackings_partial(df_t)
+        s.rows_out = len(partial['stats'])
+    return partial
+
+
+def _trackings_partial(df_t):
+    return _evaluate_partial('trackings', {'trackings': df_t})
+
+
+@register('trackings.adjusted_time', depends=['trackings', 'trackings.is_done'], columns={'trackings': ['completed_at']})
+def _adjusted_time(df_t, is_done):
+    # Owl Adjustment (2 Jam), hanya untuk baris completed (lainnya NaT)
+    return (df_t['completed_at'] - pd.Timedelta(hours=2)).where(is_done)
+
+
+@register('trackings.stats', depends=['trackings', 'trackings.is_done', 'trackings.adjusted_time'],
+          columns={'trackings': ['developer_id', 'last_viewed', 'first_opened_at', 'completed_at']})
+def _trackings_stats(df_t, is_done, adjusted_time):
+    # Satu pass di trackings: baris yang tidak memenuhi syarat suatu fitur
+    # di-mask jadi NaN/NaT (min/max/sum/count otomatis skip NaN), tanpa copy tabel.
+    completed_at = df_t['completed_at']
+
+    # Revisit: completed & ketiga tanggal valid
+    revisit_valid = is_done & df_t['first_opened_at'].notna() & completed_at.notna() & df_t['last_viewed'].notna()
+    buffer_time = pd.Timedelta(minutes=10)
+    is_revisited = (df_t['last_viewed'] > (completed_at + buffer_time)).astype(float).where(revisit_valid)
+
+    # Durasi (tanpa filter status) - Filter Idle: > 0 dan <= 30 menit
+    duration_minutes = (completed_at - df_t['first_opened_at']).dt.total_seconds() / 60
+    duration_minutes = duration_minutes.where((duration_minutes > 0) & (duration_minutes <= 30))
+
+    # copy=False: kolom tidak di-copy ke satu blok besar cuma buat groupby
+    return pd.DataFrame({
+        'developer_id': df_t['developer_id'],
+        'adjusted_time': adjusted_time,
+        'is_revisited': is_revisited,
+        'duration_minutes': duration_minutes,
+    }, copy=False).groupby('developer_id', sort=False).agg(
+        first_time=('adjusted_time', 'min'),
+        last_time=('adjusted_time', 'max'),
+        revisit_sum=('is_revisited', 'sum'),
+        revisit_count=('is_revisited', 'count'),
+        duration_sum=('duration_minutes', 'sum'),
+        duration_count=('duration_minutes', 'count'),
+    )
+
+
+@register('trackings.days', depends=['trackings', 'trackings.adjusted_time'], columns={'trackings': ['developer_id']})
+def _trackings_days(df_t, adjusted_time):
+    # Hari belajar unik per developer: filter baris completed dulu, baru dedup (tabel kecil)
+    developer_id = df_t['developer_id']
+    has_day = adjusted_time.notna() & developer_id.notna()
+    return pd.DataFrame({
+        'developer_id': developer_id[has_day],
+        'learning_date': adjusted_time[has_day].dt.normalize(),
+    }).drop_duplicates()
+
+
+@register('trackings.tutorials', depends=['trackings', 'trackings.is_done'], columns={'trackings': ['developer_id', 'tutorial_id']})
+def _trackings_tutorials(df_t, is_done):
+    developer_id = df_t['developer_id']
+    has_tutorial = is_done & developer_id.notna() & df_t['tutorial_id'].notna()
+    return pd.DataFrame({
+        'developer_id': developer_id[has_tutorial],
+        'tutorial_id': df_t['tutorial_id'][has_tutorial],
+    }).drop_duplicates()
+
+
+def merge_trackings_partials(partials):
+    stats = pd.concat([p['stats'] for p in partials]).groupby(level=0, sort=False).agg(
+        first_time=('first_time', 'min'),
+        last_time=('last_time', 'max'),
+        revisit_sum=('revisit_sum', 'sum'),
+        revisit_count=('revisit_count', 'sum'),
+        duration_sum=('duration_sum', 'sum'),
+        duration_count=('duration_count', 'sum'),
+    )
+    days = pd.concat([p['days'] for p in partials]).drop_duplicates()
+    tutorials = pd.concat([p['tutorials'] for p in partials]).drop_duplicates()
+    return {'stats': stats, 'days': days, 'tutorials': tutorials}
+
+
+def _week_of_year(day_numbers):
+    # Sama dengan strftime('%Y-%U') (minggu mulai hari Minggu, hari sebelum Minggu
+    # pertama = minggu 00) tapi dari nomor hari epoch (int64), tanpa string per baris.
+    # Hasil: tahun * 100 + minggu
+    years = day_numbers.astype('datetime64[D]').astype('datetime64[Y]')
+    day_of_year = day_numbers - years.astype('datetime64[D]').astype(np.int64)
+    weekday = (day_numbers + 4) % 7  # 1970-01-01 = Kamis, Minggu = 0
+    return (years.astype(np.int64) + 1970) * 100 + (day_of_year + 7 - weekday) // 7
+
+
+def trackings_features(partial, features=TRACKING_FEATURES):
+    # active_days, total_completed_tutorials, completion_density, consistency_score,
+    # tutorial_revisit_rate, avg_tutorial_duration
+    return _table_features('trackings', _partial_context('trackings', partial), features)
+
+
+@register('trackings.day_codes', depends=['trackings.days'])
+def _day_codes(days):
+    # Satu factorize developer (days sudah unik per developer & tanggal),
+    # dipakai bareng active_days & consistency_score
+    return pd.factorize(days['developer_id'])
+
+
+@register('active_days', depends=['trackings.day_codes', 'trackings.stats'], group='trackings')
+def _active_days(day_codes, stats):
+    dev_codes, dev_ids = day_codes
+    day_counts = np.bincount(dev_codes, minlength=len(dev_ids))
+    return pd.Series(day_counts, index=dev_ids).reindex(stats.index, fill_value=0)
+
+
+@register('total_completed_tutorials', depends=['trackings.tutorials', 'trackings.stats'], group='trackings')
+def _total_completed_tutorials(tutorials, stats):
+    return tutorials.groupby('developer_id').size().reindex(stats.index, fill_value=0)
+
+
+@register('completion_density', depends=['total_completed_tutorials', 'active_days'], group='trackings')
+def _completion_density(total_completed_tutorials, active_days):
+    # Density = Total / Active Days
+    return total_completed_tutorials / active_days.replace(0, 1)
+
+
+@register('consistency_score', depends=['trackings.days', 'trackings.day_codes', 'trackings.stats', 'active_days'], group='trackings')
+def _consistency_score(days, day_codes, stats, active_days):
+    # Consistency (Weighted 70:30): Span & Total Weeks
+    dev_codes, dev_ids = day_codes
+    total_days = (stats['last_time'] - stats['first_time']).dt.days + 1
+    total_weeks = np.ceil(total_days / 7)
+    day_numbers = days['learning_date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+    # Key unik (developer, minggu) dalam satu int64, minggu < 1e6 (tahun * 100 + minggu)
+    week_keys = pd.unique(dev_codes.astype(np.int64) * 1_000_000 + _week_of_year(day_numbers))
+    week_counts = np.bincount(week_keys // 1_000_000, minlength=len(dev_ids))
+    active_weeks = pd.Series(week_counts, index=dev_ids).reindex(stats.index)
+    score_daily = active_days / total_days
+    score_weekly = active_weeks / total_weeks
+    return ((0.7 * score_weekly) + (0.3 * score_daily)).clip(upper=1.0)
+
+
+@register('tutorial_revisit_rate', depends=['trackings.stats'], group='trackings')
+def _tutorial_revisit_rate(stats):
+    return stats['revisit_sum'] / stats['revisit_count'].replace(0, np.nan)
+
+
+@register('avg_tutorial_duration', depends=['trackings.stats'], group='trackings')
+def _avg_tutorial_duration(stats):
+    return stats['duration_sum'] / stats['duration_count'].replace(0, np.nan)
+
+
+def submissions_partial(df_sub):
+    with stage('submissions_partial', rows_in=len(df_sub)) as s:
+        partial = _submissions_partial(df_sub)
+        s.rows_out = len(partial['quizzes'])
+    return partial
+
+
+def _submissions_partial(df_sub):
+    return _evaluate_partial('submissions', {'submissions': df_sub})
+
+
+@register('submissions.stats', depends=['submissions'], columns={'submissions': ['submitter_id', 'rating']})
+def _submissions_stats(df_sub):
+    # Rating: semua submission yang punya rating
+    return df_sub.groupby('submitter_id', sort=False).agg(
+        rating_sum=('rating', 'sum'),
+        rating_count=('rating', 'count'),
+    )
+
+
+@register('submissions.quizzes', depends=['submissions'],
+          columns={'submissions': ['id', 'submitter_id', 'quiz_id', 'status', 'created_at', 'ended_review_at']})
+def _submissions_quizzes(df_sub):
+    # Revisi dihitung per (submitter, quiz) dari submission dengan status != -2
+    df_valid = df_sub.loc[df_sub['status'] != -2, ['submitter_id', 'quiz_id', 'id', 'status', 'created_at', 'ended_review_at']]
+    df_valid = df_valid.sort_values(['submitter_id', 'quiz_id', 'id'])
+    group = df_valid.groupby(['submitter_id', 'quiz_id'], sort=False)
+
+    # Shift ambil waktu sebelumnya, hitung selisih jam. Validasi: > 0 dan <= 720 jam
+    prev_ended_review_at = group['ended_review_at'].shift(1)
+    revision_duration_hours = (df_valid['created_at'] - prev_ended_review_at).dt.total_seconds() / 3600
+    revision_duration_hours = revision_duration_hours.where((revision_duration_hours > 0) & (revision_duration_hours <= 720))
+
+    # Batas awal/akhir tiap grup disimpan supaya pasangan (submission terakhir chunk A,
+    # submission pertama chunk B) tetap ikut dihitung saat partial digabung.
+    # ('first'/'last' bawaan groupby skip NaT, jadi posisinya diambil lewat cumcount)
+    df_valid = df_valid.assign(
+        is_revision=(df_valid['status'] == -1).astype(int),
+        revision_duration_hours=revision_duration_hours,
+        boundary_created_at=df_valid['created_at'].where(group.cumcount() == 0),
+        boundary_ended_review_at=df_valid['ended_review_at'].where(group.cumcount(ascending=False) == 0),
+    )
+    return df_valid.groupby(['submitter_id', 'quiz_id'], sort=False).agg(
+        total_revisions=('is_revision', 'sum'),
+        first_id=('id', 'min'),
+        first_created_at=('boundary_created_at', 'max'),
+        last_id=('id', 'max'),
+        last_ended_review_at=('boundary_ended_review_at', 'max'),
+        duration_sum=('revision_duration_hours', 'sum'),
+        duration_count=('revision_duration_hours', 'count'),
+    )
+
+
+def merge_submissions_partials(partials):
+    stats = pd.concat([p['stats'] for p in partials]).groupby(level=0, sort=False).sum()
+
+    quizzes = pd.concat([p['quizzes'] for p in partials]).reset_index()
+    quizzes = quizzes.sort_values(['submitter_id', 'quiz_id', 'first_id'])
+    group = quizzes.groupby(['submitter_id', 'quiz_id'], sort=False)
+
+    # Durasi revisi butuh urutan id per quiz, jadi potongan yang saling tumpang tindih tidak bisa digabung
+    prev_last_id = group['last_id'].shift(1)
+    if (quizzes['first_id'] <= prev_last_id).any():
+        raise ValueError("Submissions must arrive in increasing id order per (submitter_id, quiz_id) to merge partial aggregates; sort the submissions by id first.")
+
+    boundary_hours = (quizzes['first_created_at'] - group['last_ended_review_at'].shift(1)).dt.total_seconds() / 3600
+    boundary_hours = boundary_hours.where((boundary_hours > 0) & (boundary_hours <= 720))
+    quizzes = quizzes.assign(
+        duration_sum=quizzes['duration_sum'] + boundary_hours.fillna(0),
+        duration_count=quizzes['duration_count'] + boundary_hours.notna().astype(int),
+        first_created_at=quizzes['first_created_at'].where(group.cumcount() == 0),
+        last_ended_review_at=quizzes['last_ended_review_at'].where(group.cumcount(ascending=False) == 0),
+    )
+
+    quizzes = quizzes.groupby(['submitter_id', 'quiz_id'], sort=False).agg(
+        total_revisions=('total_revisions', 'sum'),
+        first_id=('first_id', 'min'),
+        first_created_at=('first_created_at', 'max'),
+        last_id=('last_id', 'max'),
+        last_ended_review_at=('last_ended_review_at', 'max'),
+        duration_sum=('duration_sum', 'sum'),
+        duration_count=('duration_count', 'sum'),
+    )
+    return {'stats': stats, 'quizzes': quizzes}
+
+
+def submissions_features(partial, features=SUBMISSION_FEATURES):
+    # avg_submission_revision_count, avg_submission_revision_duration, avg_submission_rating
+    return _table_features('submissions', _partial_context('submissions', partial), features)
+
+
+@register('submissions.by_user', depends=['submissions.quizzes'])
+def _quizzes_by_user(quizzes):
+    return quizzes.groupby(level='submitter_id')
 
-    # --- 1. BASE DATAFRAME (Sesuai TXT: Basis Users) ---
-    if 'users' in dfs and not dfs['users'].empty:
-        df_master_features = dfs['users'][['id', 'created_at']].rename(columns={'id': 'developer_id'})
-    else:
-        # Fallback
-        all_ids = pd.concat([dfs['trackings']['developer_id'], dfs['submissions']['submitter_id']]).unique()
-        df_master_features = pd.DataFrame({'developer_id': all_ids})
 
-    # --- 2. avg_weighted_exam_score (Sesuai TXT) ---
-    if not dfs['exam_results'].empty and not dfs['exam_registrations'].empty:
-        df_res = dfs['exam_results'].copy()
-        df_reg = dfs['exam_registrations'].copy()
+@register('avg_submission_revision_count', depends=['submissions.by_user'], group='submissions')
+def _avg_submission_revision_count(by_user):
+    return by_user['total_revisions'].mean()
 
-        # Merge results -> registrations
+
+@register('avg_submission_revision_duration', depends=['submissions.by_user'], group='submissions')
+def _avg_submission_revision_duration(by_user):
+    durations = by_user[['duration_sum', 'duration_count']].sum()
+    return durations['duration_sum'] / durations['duration_count'].replace(0, np.nan)
+
+
+@register('avg_submission_rating', depends=['submissions.stats'], group='submissions')
+def _avg_submission_rating(stats):
+    return stats['rating_sum'] / stats['rating_count'].replace(0, np.nan)
+
+
+def exams_partial(df_reg, df_res, known_registrations=None):
+    with stage('exams_partial', rows_in=len(df_reg) + len(df_res)) as s:
+        partial = _exams_partial(df_reg, df_res, known_registrations)
+        s.rows_out = len(partial['stats'])
+    return partial
+
+
+def _exams_partial(df_reg, df_res, known_registrations=None):
+    return _evaluate_partial('exams', {
+        'exam_registrations': df_reg,
+        'exam_results': df_res,
+        'known_registrations': known_registrations,
+    })
+
+
+@register('exams.registrations', depends=['exam_registrations'], columns={'exam_registrations': ['id', 'examinees_id']})
+def _exam_registrations(df_reg):
+    # Peta id registrasi -> examinees_id buat join hasil ujian
+    return df_reg[['id', 'examinees_id']] if not df_reg.empty else pd.DataFrame(columns=['id', 'examinees_id'])
+
+
+@register('exams.stats', depends=['exam_registrations', 'exam_results', 'exams.registrations', 'known_registrations'],
+          columns={'exam_registrations': ['examinees_id', 'created_at', 'deadline_at', 'exam_finished_at'],
+                   'exam_results': ['exam_registration_id', 'score', 'total_questions']})
+def _exams_stats(df_reg, df_res, registrations, known_registrations):
+    # known_registrations (dari feature store) dipakai kalau hasil ujian datang setelah registrasinya.
+    all_registrations = registrations
+    if known_registrations is not None:
+        all_registrations = pd.concat([known_registrations, registrations]).drop_duplicates()
+    parts = []
+
+    # avg_weighted_exam_score: Merge results -> registrations
+    if not df_res.empty and not all_registrations.empty:
         exam_merged = df_res.merge(
-            df_reg[['id', 'examinees_id']],
+            all_registrations,
             left_on='exam_registration_id',
             right_on='id',
             how='inner'
         )
-
-        # Hitung weighted score per baris
         exam_merged['weighted_score'] = exam_merged['score'] * exam_merged['total_questions']
+        parts.append(exam_merged.groupby('examinees_id', sort=False).agg(
+            weighted_sum=('weighted_score', 'sum'),
+            questions_sum=('total_questions', 'sum')
+        ))
 
-        # Agregasi per user
-        user_exam_stats = exam_merged.groupby('examinees_id').agg(
-            sum_weighted=('weighted_score', 'sum'),
-            sum_questions=('total_questions', 'sum')
-        )
+    # exam_duration_utilization_ratio: Filter finished & deadline > created
+    if not df_reg.empty:
+        mask_valid = df_reg['exam_finished_at'].notna() & (df_reg['deadline_at'] > df_reg['created_at'])
+        df_exam_valid = df_reg.loc[mask_valid, ['examinees_id', 'created_at', 'deadline_at', 'exam_finished_at']]
 
-        # Hitung rata-rata tertimbang
-        user_exam_stats['avg_weighted_exam_score'] = (
-            user_exam_stats['sum_weighted'] / user_exam_stats['sum_questions'].replace(0, 1)
-        )
+        max_seconds = (df_exam_valid['deadline_at'] - df_exam_valid['created_at']).dt.total_seconds()
+        used_seconds = (df_exam_valid['exam_finished_at'] - df_exam_valid['created_at']).dt.total_seconds()
+        # Ratio & Cap
+        utilization_ratio = (used_seconds / max_seconds.replace(0, 1)).clip(lower=0.0, upper=1.0)
+        parts.append(utilization_ratio.groupby(df_exam_valid['examinees_id'], sort=False).agg(['sum', 'count'])
+                     .rename(columns={'sum': 'util_sum', 'count': 'util_count'}))
 
-        # Merge ke Master
-        df_master_features = df_master_features.merge(
-            user_exam_stats[['avg_weighted_exam_score']],
-            left_on='developer_id',
-            right_index=True,
-            how='left'
-        )
-    else:
-        df_master_features['avg_weighted_exam_score'] = 0
-    
-    df_master_features['avg_weighted_exam_score'] = df_master_features['avg_weighted_exam_score'].fillna(0)
-
-    # --- 3. exam_duration_utilization_ratio (Sesuai TXT) ---
-    if not dfs['exam_registrations'].empty:
-        df_reg = dfs['exam_registrations'].copy()
-        
-        # Filter finished & deadline > created
-        mask_valid = df_reg['exam_finished_at'].notna() & (df_reg['deadline_at'] > df_reg['created_at'])
-        df_exam_valid = df_reg[mask_valid].copy()
-
-        if not df_exam_valid.empty:
-            df_exam_valid['max_seconds'] = (df_exam_valid['deadline_at'] - df_exam_valid['created_at']).dt.total_seconds()
-            df_exam_valid['used_seconds'] = (df_exam_valid['exam_finished_at'] - df_exam_valid['created_at']).dt.total_seconds()
-            
-            # Ratio & Cap
-            df_exam_valid['utilization_ratio'] = (df_exam_valid['used_seconds'] / df_exam_valid['max_seconds'].replace(0, 1)).clip(lower=0.0, upper=1.0)
-            
-            user_exam_util = df_exam_valid.groupby('examinees_id')['utilization_ratio'].mean().rename('exam_duration_utilization_ratio')
-            
-            df_master_features = df_master_features.merge(
-                user_exam_util,
-                left_on='developer_id',
-                right_index=True,
-                how='left'
-            )
-        else:
-            df_master_features['exam_duration_utilization_ratio'] = 0.0
-    else:
-        df_master_features['exam_duration_utilization_ratio'] = 0.0
-        
-    df_master_features['exam_duration_utilization_ratio'] = df_master_features['exam_duration_utilization_ratio'].fillna(0.0)
-
-    # --- 4. avg_submission_revision_count (Sesuai TXT) ---
-    if not dfs['submissions'].empty:
-        df_sub = dfs['submissions'].copy()
-        # Filter status != -2
-        df_sub_valid = df_sub[df_sub['status'] != -2].copy()
-
-        if not df_sub_valid.empty:
-            # Hitung revisi (status == -1)
-            df_sub_valid['is_revision'] = (df_sub_valid['status'] == -1).astype(int)
-            
-            project_revisions = df_sub_valid.groupby(['submitter_id', 'quiz_id']).agg(
-                total_revisions=('is_revision', 'sum')
-            ).reset_index()
-            
-            user_rev_count = project_revisions.groupby('submitter_id')['total_revisions'].mean().rename('avg_submission_revision_count')
-            
-            df_master_features = df_master_features.merge(
-                user_rev_count,
-                left_on='developer_id',
-                right_index=True,
-                how='left'
-            )
-        else:
-            df_master_features['avg_submission_revision_count'] = 0.0
-    else:
-        df_master_features['avg_submission_revision_count'] = 0.0
-    
-    df_master_features['avg_submission_revision_count'] = df_master_features['avg_submission_revision_count'].fillna(0.0)
-
-    # --- 5. avg_submission_revision_duration (Sesuai TXT) ---
-    if not dfs['submissions'].empty:
-        df_sub = dfs['submissions'].copy()
-        df_sub_valid = df_sub[df_sub['status'] != -2].copy()
-
-        if not df_sub_valid.empty:
-            df_sub_valid = df_sub_valid.sort_values(['submitter_id', 'quiz_id', 'id'])
-            # Shift ambil waktu sebelumnya
-            df_sub_valid['prev_ended_review_at'] = df_sub_valid.groupby(['submitter_id', 'quiz_id'])['ended_review_at'].shift(1)
-            
-            # Hitung selisih jam
-            df_sub_valid['revision_duration_hours'] = (
-                df_sub_valid['created_at'] - df_sub_valid['prev_ended_review_at']
-            ).dt.total_seconds() / 3600
-            
-            # Validasi: > 0 dan <= 720 jam
-            mask_valid_rev = (df_sub_valid['revision_duration_hours'] > 0) & (df_sub_valid['revision_duration_hours'] <= 720)
-            df_rev_clean = df_sub_valid[mask_valid_rev]
-            
-            user_rev_duration = df_rev_clean.groupby('submitter_id')['revision_duration_hours'].mean().rename('avg_submission_revision_duration')
-            
-            df_master_features = df_master_features.merge(
-                user_rev_duration,
-                left_on='developer_id',
-                right_index=True,
-                how='left'
-            )
-        else:
-            df_master_features['avg_submission_revision_duration'] = 0.0
-    else:
-        df_master_features['avg_submission_revision_duration'] = 0.0
-        
-    df_master_features['avg_submission_revision_duration'] = df_master_features['avg_submission_revision_duration'].fillna(0.0)
-
-    # --- 6. avg_submission_rating (Sesuai TXT) ---
-    if not dfs['submissions'].empty:
-        df_sub = dfs['submissions'].copy()
-        df_sub_valid = df_sub[df_sub['rating'].notna()].copy()
-
-        if not df_sub_valid.empty:
-            user_rating = df_sub_valid.groupby('submitter_id')['rating'].mean().rename('avg_submission_rating')
-            df_master_features = df_master_features.merge(
-                user_rating,
-                left_on='developer_id',
-                right_index=True,
-                how='left'
-            )
-        else:
-            df_master_features['avg_submission_rating'] = 0.0
-    else:
-        df_master_features['avg_submission_rating'] = 0.0
-    
-    df_master_features['avg_submission_rating'] = df_master_features['avg_submission_rating'].fillna(0.0)
-
-    # --- 7. active_days (Sesuai TXT: Strict Owl 2 AM) ---
-    if not dfs['trackings'].empty:
-        df_t = dfs['trackings'].copy()
-        
-        # Filter Completed Only
-        if 'status' in df_t.columns:
-            is_done = df_t['status'].astype(str).str.contains('completed|passed|1', case=False, regex=True)
-            df_done = df_t[is_done].copy()
-        else:
-            df_done = df_t[df_t['completed_at'].notna()].copy()
-
-        if not df_done.empty:
-            # Owl Adjustment (2 Jam)
-            df_done['adjusted_time'] = df_done['completed_at'] - pd.Timedelta(hours=2)
-            df_done['learning_date'] = df_done['adjusted_time'].dt.date
-            
-            user_active_days = df_done.groupby('developer_id')['learning_date'].nunique().rename('active_days')
-            
-            df_master_features = df_master_features.merge(
-                user_active_days,
-                left_on='developer_id',
-                right_index=True,
-                how='left'
-            )
-        else:
-            df_master_features['active_days'] = 0
-    else:
-        df_master_features['active_days'] = 0
-        
-    df_master_features['active_days'] = df_master_features['active_days'].fillna(0)
-
-    # --- 8. completion_density (Sesuai TXT: Total / Active) ---
-    if not dfs['trackings'].empty:
-        df_t = dfs['trackings'].copy()
-        
-        if 'status' in df_t.columns:
-            is_done = df_t['status'].astype(str).str.contains('completed|passed|1', case=False, regex=True)
-            df_done = df_t[is_done].copy()
-        else:
-            df_done = df_t[df_t['completed_at'].notna()].copy()
-
-        if not df_done.empty:
-            # Numerator: Total Tutorial Selesai
-            user_total_completed = df_done.groupby('developer_id')['tutorial_id'].nunique().rename('total_completed_tutorials')
-            
-            df_master_features = df_master_features.merge(
-                user_total_completed,
-                left_on='developer_id',
-                right_index=True,
-                how='left'
-            )
-            df_master_features['total_completed_tutorials'] = df_master_features['total_completed_tutorials'].fillna(0)
-            
-            # Density = Total / Active Days
-            df_master_features['completion_density'] = (
-                df_master_features['total_completed_tutorials'] / 
-                df_master_features['active_days'].replace(0, 1)
-            )
-        else:
-            df_master_features['completion_density'] = 0.0
-    else:
-        df_master_features['completion_density'] = 0.0
-        
-    df_master_features['completion_density'] = df_master_features['completion_density'].fillna(0.0)
-
-    # --- 9. consistency_score (Sesuai TXT: Weighted 70:30) ---
-    if not dfs['trackings'].empty:
-        df_t = dfs['trackings'].copy()
-        
-        if 'status' in df_t.columns:
-            is_done = df_t['status'].astype(str).str.contains('completed|passed|1', case=False, regex=True)
-            df_done = df_t[is_done & df_t['completed_at'].notna()].copy()
-        else:
-            df_done = df_t[df_t['completed_at'].notna()].copy()
-
-        if not df_done.empty:
-            df_done['adjusted_time'] = df_done['completed_at'] - pd.Timedelta(hours=2)
-            df_done['learning_date_dt'] = df_done['adjusted_time'].dt.normalize()
-
-            # Span & Total Weeks
-            user_span = df_done.groupby('developer_id')['adjusted_time'].agg(['min', 'max'])
-            user_span['total_days'] = (user_span['max'] - user_span['min']).dt.days + 1
-            user_span['total_weeks'] = np.ceil(user_span['total_days'] / 7)
-
-            # Daily Count
-            daily_counts = df_done.groupby('developer_id')['learning_date_dt'].nunique().rename('active_days_count')
-            
-            # Weekly Count
-            df_done['week_id'] = df_done['adjusted_time'].dt.strftime('%Y-%U')
-            weekly_counts = df_done.groupby('developer_id')['week_id'].nunique().rename('active_weeks')
-
-            stats = user_span.join(daily_counts).join(weekly_counts)
-            
-            stats['score_daily'] = stats['active_days_count'] / stats['total_days']
-            stats['score_weekly'] = stats['active_weeks'] / stats['total_weeks']
-            
-            stats['consistency_score'] = (0.7 * stats['score_weekly']) + (0.3 * stats['score_daily'])
-            stats['consistency_score'] = stats['consistency_score'].clip(upper=1.0)
-            
-            df_master_features = df_master_features.merge(
-                stats[['consistency_score']],
-                left_on='developer_id',
-                right_index=True,
-                how='left'
-            )
-        else:
-            df_master_features['consistency_score'] = 0.0
-    else:
-        df_master_features['consistency_score'] = 0.0
-        
-    df_master_features['consistency_score'] = df_master_features['consistency_score'].fillna(0.0)
-
-    # --- 10. tutorial_revisit_rate (Sesuai TXT) ---
-    if not dfs['trackings'].empty:
-        df_t = dfs['trackings'].copy()
-        # Filter valid dates & completed
-        df_t = df_t.dropna(subset=['first_opened_at', 'completed_at', 'last_viewed'])
-        
-        if 'status' in df_t.columns:
-            is_done = df_t['status'].astype(str).str.contains('completed|passed|1', case=False, regex=True)
-            df_done = df_t[is_done].copy()
-        else:
-            df_done = df_t.copy()
-
-        if not df_done.empty:
-            buffer_time = pd.Timedelta(minutes=10)
-            df_done['is_revisited'] = (df_done['last_viewed'] > (df_done['completed_at'] + buffer_time)).astype(int)
-            
-            user_revisit_rate = df_done.groupby('developer_id')['is_revisited'].mean().rename('tutorial_revisit_rate')
-            
-            df_master_features = df_master_features.merge(
-                user_revisit_rate,
-                left_on='developer_id',
-                right_index=True,
-                how='left'
-            )
-        else:
-            df_master_features['tutorial_revisit_rate'] = 0.0
-    else:
-        df_master_features['tutorial_revisit_rate'] = 0.0
-        
-    df_master_features['tutorial_revisit_rate'] = df_master_features['tutorial_revisit_rate'].fillna(0.0)
-
-    # --- 11. avg_tutorial_duration (Sesuai TXT: Idle Filter) ---
-    if not dfs['trackings'].empty:
-        df_t = dfs['trackings'].copy()
-        df_t = df_t.dropna(subset=['first_opened_at', 'completed_at'])
-        
-        if not df_t.empty:
-            df_t['duration_minutes'] = (df_t['completed_at'] - df_t['first_opened_at']).dt.total_seconds() / 60
-            
-            # Filter Idle: > 0 dan <= 30 menit
-            mask_valid_duration = (df_t['duration_minutes'] > 0) & (df_t['duration_minutes'] <= 30)
-            df_clean_duration = df_t[mask_valid_duration].copy()
-            
-            user_avg_duration = df_clean_duration.groupby('developer_id')['duration_minutes'].mean().rename('avg_tutorial_duration')
-            
-            df_master_features = df_master_features.merge(
-                user_avg_duration,
-                left_on='developer_id',
-                right_index=True,
-                how='left'
-            )
-        else:
-            df_master_features['avg_tutorial_duration'] = 0.0
+    stats = pd.concat(parts, axis=1) if parts else pd.DataFrame()
+    return stats.reindex(columns=['weighted_sum', 'questions_sum', 'util_sum', 'util_count']).fillna(0)
+
+
+def merge_exams_partials(partials):
+    stats = pd.concat([p['stats'] for p in partials]).groupby(level=0, sort=False).sum()
+    registrations = pd.concat([p['registrations'] for p in partials]).drop_duplicates()
+    return {'stats': stats, 'registrations': registrations}
+
+
+def exams_features(partial, features=EXAM_FEATURES):
+    # avg_weighted_exam_score, exam_duration_utilization_ratio
+    return _table_features('exams', _partial_context('exams', partial), features)
+
+
+@register('avg_weighted_exam_score', depends=['exams.stats'], group='exams')
+def _avg_weighted_exam_score(stats):
+    return stats['weighted_sum'] / stats['questions_sum'].replace(0, 1)
+
+
+@register('exam_duration_utilization_ratio', depends=['exams.stats'], group='exams')
+def _exam_duration_utilization_ratio(stats):
+    return stats['util_sum'] / stats['util_count'].replace(0, np.nan)
+
+
+def _features_of(table, features):
+    return [name for name in features if group_of(name) == table]
+
+
+def _table_features(table, context, features):
+    # Fitur satu tabel dari input mentah / partial, index = developer di '<tabel>.stats'
+    values = evaluate(list(features) + [f'{table}.stats'], context)
+    result = pd.DataFrame(index=values[f'{table}.stats'].index)
+    for name in features:
+        result[name] = values[name]
+    return result
+
+
+def _merge_features(df_master_features, features, columns):
+    if features is None:
+        for col in columns:
+            df_master_features[col] = 0.0
+        return df_master_features
+
+    df_master_features = df_master_features.merge(
+        features[columns],
+        left_on='developer_id',
+        right_index=True,
+        how='left'
+    )
+    # Kolom yang isinya null semua bisa keluar dari merge sebagai object: samakan ke float64
+    # dulu biar dtype hasil selalu sama (dan fillna gak kena downcast object)
+    df_master_features[columns] = df_master_features[columns].astype('float64').fillna(0.0)
+    return df_master_features
+
+
+def _prepare_tables(dfs, tables, columns=None):
+    # columns: tabel -> kolom yang dibutuhkan (default semua kolom fitur)
+    dfs = dict(dfs)
+    for tbl in tables:
+        if tbl not in dfs: dfs[tbl] = pd.DataFrame()
+        elif not dfs[tbl].empty:
+            with stage('normalize', rows_in=len(dfs[tbl])) as s:
+                dfs[tbl] = normalize_table(dfs[tbl], tbl, columns.get(tbl) if columns else None)
+                s.rows_out = len(dfs[tbl])
+    return dfs
+
+
+def compute_partials(dfs, known_registrations=None):
+    # Partial aggregate semua tabel yang ada di memori
+    dfs = _prepare_tables(dfs, ['exam_results', 'exam_registrations', 'submissions', 'trackings'])
+    return {
+        'exams': exams_partial(dfs['exam_registrations'], dfs['exam_results'], known_registrations),
+        'submissions': submissions_partial(dfs['submissions']) if not dfs['submissions'].empty else None,
+        'trackings': trackings_partial(dfs['trackings']) if not dfs['trackings'].empty else None,
+    }
+
+
+def compute_partials_chunked(dfs, trackings_chunks=(), submissions_chunks=()):
+    # Mode chunked (buat data yang gak muat di RAM): trackings & submissions dibaca
+    # per chunk (misal dari pd.read_csv(..., chunksize=N)), tiap chunk diringkas jadi
+    # partial aggregate per developer lalu digabung di akhir. Tabel exam tetap lewat dfs.
+    # Catatan: chunk submissions harus urut id per (submitter, quiz) antar chunk. Dari CSV yang
+    # urutannya bebas, lewatkan dulu sharded_features.spill_by_developer (train.py melakukannya).
+    dfs = _prepare_tables(dfs, ['exam_results', 'exam_registrations'])
+    tracking_parts = [trackings_partial(normalize_table(chunk, 'trackings')) for chunk in trackings_chunks if not chunk.empty]
+    submission_parts = [submissions_partial(normalize_table(chunk, 'submissions')) for chunk in submissions_chunks if not chunk.empty]
+    return {
+        'exams': exams_partial(dfs['exam_registrations'], dfs['exam_results']),
+        'submissions': merge_submissions_partials(submission_parts) if submission_parts else None,
+        'trackings': merge_trackings_partials(tracking_parts) if tracking_parts else None,
+    }
+
+
+def merge_partials(old, new):
+    # Gabung dua set partial (misal: yang tersimpan di feature store + event baru)
+    merged = {}
+    for name, merge_fn in [('exams', merge_exams_partials), ('submissions', merge_submissions_partials), ('trackings', merge_trackings_partials)]:
+        parts = [p[name] for p in (old, new) if p.get(name) is not None]
+        merged[name] = merge_fn(parts) if parts else None
+    return merged
+
+
+def perform_feature_engineering_final(dfs, features=None):
+    # features: fitur yang dibutuhkan (default ALL_FEATURES). Cuma node registry yang
+    # dipakai fitur itu yang dihitung, dan cuma kolom yang dibacanya yang di-parse.
+    # --- 0. PREPARATION ---
+    required_tables = ['users', 'exam_results', 'exam_registrations', 'submissions', 'trackings', 'completions', 'journeys', 'tutorials']
+    for tbl in required_tables:
+        if tbl not in dfs: dfs[tbl] = pd.DataFrame()
+
+    features = ALL_FEATURES if features is None else list(features)
+    columns = required_columns(features)
+    dfs = _prepare_tables(dfs, list(columns), columns)
+
+    table_features = {}
+    for table, inputs in TABLE_INPUTS.items():
+        names = _features_of(table, features)
+        # Tabel kosong = fitur 0 (sama seperti partial None di compute_partials)
+        if not names or all(dfs[name].empty for name in inputs):
+            table_features[table] = None
+            continue
+        context = {name: dfs[name] for name in inputs}
+        context['known_registrations'] = None
+        table_features[table] = _table_features(table, context, names)
+
+    with stage('build_features', rows_in=len(dfs['users'])) as s:
+        df_master_features = assemble_features(dfs['users'], table_features, features)
+        s.rows_out = len(df_master_features)
+    return df_master_features
+
+
+def perform_feature_engineering_chunked(dfs, trackings_chunks=(), submissions_chunks=()):
+    # Hasilnya sama dengan perform_feature_engineering_final, lihat compute_partials_chunked
+    partials = compute_partials_chunked(dfs, trackings_chunks, submissions_chunks)
+    return build_features_from_partials(dfs.get('users', pd.DataFrame()), partials)
+
+
+def build_features_from_partials(users, partials, features=ALL_FEATURES):
+    with stage('build_features', rows_in=len(users) if users is not None else 0) as s:
+        df_master_features = assemble_features(users, features_from_partials(partials, features), features)
+        s.rows_out = len(df_master_features)
+    return df_master_features
+
+
+def features_from_partials(partials, features=ALL_FEATURES):
+    # Fitur per tabel (index = developer) dari partial aggregate
+    return {
+        table: _table_features(table, _partial_context(table, partials[table]), _features_of(table, features))
+        if partials[table] is not None else None
+        for table in PARTIAL_NODES
+    }
+
+
+def assemble_features(users, table_features, features=ALL_FEATURES):
+    # Gabung fitur per tabel (hasil features_from_partials) ke basis users
+    trackings, submissions = table_features['trackings'], table_features['submissions']
+
+    # --- 1. BASE DATAFRAME (Sesuai TXT: Basis Users) ---
+    if users is not None and not users.empty:
+        df_master_features = users[['id', 'created_at']].rename(columns={'id': 'developer_id'})
     else:
-        df_master_features['avg_tutorial_duration'] = 0.0
-        
-    df_master_features['avg_tutorial_duration'] = df_master_features['avg_tutorial_duration'].fillna(0.0)
+        # Fallback: semua developer yang muncul di trackings/submissions
+        id_sources = [f.index.to_series() for f in (trackings, submissions) if f is not None]
+        all_ids = pd.concat(id_sources).unique() if id_sources else []
+        df_master_features = pd.DataFrame({'developer_id': all_ids})
+
+    # --- 2-3. EXAM FEATURES (Sesuai TXT) ---
+    # avg_weighted_exam_score, exam_duration_utilization_ratio
+    df_master_features = _merge_features(df_master_features, table_features['exams'], _features_of('exams', features))
+
+    # --- 4-6. SUBMISSION FEATURES (Sesuai TXT) ---
+    # avg_submission_revision_count, avg_submission_revision_duration, avg_submission_rating
+    df_master_features = _merge_features(df_master_features, submissions, _features_of('submissions', features))
+
+    # --- 7-11. TRACKINGS FEATURES (Sesuai TXT) ---
+    df_master_features = _merge_features(df_master_features, trackings, _features_of('trackings', features))
 
     # Final Set Index
     df_master_features = df_master_features.set_index('developer_id')
+    # Id di pipeline int32 (hemat memori), hasil akhir tetap int64 seperti sebelumnya
+    if pd.api.types.is_integer_dtype(df_master_features.index):
+        df_master_features.index = df_master_features.index.astype(np.int64)
     return df_master_features
@@ -0,0 +1,126 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+# Model bundle: satu file .npz berisi semua yang dibutuhkan inference sebagai array
+# NumPy biasa (urutan fitur, center & scale RobustScaler, centroid KMeans, label).
+# Predict = (X - center) / scale lalu cari centroid terdekat, tanpa lewat sklearn.
+# counts (opsional) = jumlah user per cluster saat training, dipakai training incremental.
+BUNDLE_VERSION = 1
+BUNDLE_FILENAME = 'model_bundle.npz'
+
+# Mapping Label (Pastikan mapping ini sesuai hasil trainingmu!)
+# Tips: Nanti pas training, cek dulu cluster 0 itu karakternya apa, baru update list ini.
+DEFAULT_LABELS = ["Fast Learner", "Reflective Learner", "Consistent Learner"]
+
+
+class ModelBundle:
+    def __init__(self, features, center, scale, centroids, labels, version=BUNDLE_VERSION, counts=None):
+        self.version = int(version)
+        self.features = list(features)
+        self.center = np.asarray(center, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.centroids = np.asarray(centroids, dtype=np.float64)
+        self.labels = list(labels)
+
+        n_features = len(self.features)
+        if self.center.shape != (n_features,) or self.scale.shape != (n_features,):
+            raise ValueError(f"Scaler shape does not match {n_features} features")
+        if self.centroids.ndim != 2 or self.centroids.shape[1] != n_features:
+            raise ValueError(f"Centroids shape {self.centroids.shape} does not match {n_features} features")
+        if len(self.labels) != len(self.centroids):
+            raise ValueError(f"Got {len(self.labels)} labels for {len(self.centroids)} clusters")
+        self.counts = None if counts is None else np.asarray(counts, dtype=np.float64)
+        if self.counts is not None and self.counts.shape != (len(self.centroids),):
+            raise ValueError(f"Got {self.counts.shape} cluster counts for {len(self.centroids)} clusters")
+
+        # Hash isi model (yang ngaruh ke hasil prediksi), dihitung sekali saat load: identitas
+        # model yang benar-benar dipakai, misal buat key cache hasil
+        digest = hashlib.sha256(json.dumps([self.features, self.labels]).encode('utf-8'))
+        for arr in (self.center, self.scale, self.centroids):
+            digest.update(np.ascontiguousarray(arr).tobytes())
+        self.fingerprint = digest.hexdigest()[:16]
+
+        # ||c||^2 dihitung sekali, sisa jarak per baris cukup satu matmul
+        self._centroid_sq_norms = (self.centroids ** 2).sum(axis=1)
+        # Centroid dalam satuan fitur asli (kebalikan RobustScaler), buat /clusters & dashboard
+        self.centroids_original = self.centroids * self.scale + self.center
+
+    def transform(self, X):
+        # Sama dengan RobustScaler.transform
+        return (np.asarray(X, dtype=np.float64) - self.center) / self.scale
+
+    def predict(self, X):
+        return self.predict_scaled(self.transform(X))
+
+    def predict_scaled(self, X_scaled):
+        # Sama dengan KMeans.predict: argmin ||x - c||^2 (suku ||x||^2 konstan per baris, jadi di-skip)
+        return np.argmin(self._centroid_sq_norms - 2.0 * X_scaled @ self.centroids.T, axis=1)
+
+    def explain_scaled(self, X_scaled):
+        # Prediksi + penjelasannya:
+        #   distances     : jarak euclid (scaled) ke tiap centroid, shape (n, k)
+        #   memberships   : soft assignment ala fuzzy c-means (m=2), bobot 1/d^2 dinormalisasi
+        #   contributions : (x - centroid cluster terpilih)^2 per fitur, totalnya = jarak^2
+        # Cluster tetap dari predict_scaled (hasil sama dengan tanpa explain), tapi jaraknya dihitung
+        # langsung dari selisih, bukan bentuk ekspansi ||c||^2 - 2x.c + ||x||^2 yang kehilangan
+        # presisi (cancellation): distances, memberships & contributions jadi konsisten dan
+        # titik tepat di centroid benar-benar dapat jarak 0
+        clusters = self.predict_scaled(X_scaled)
+        sq_distances = ((X_scaled[:, None, :] - self.centroids) ** 2).sum(axis=-1)
+
+        with np.errstate(divide='ignore'):
+            weights = 1.0 / sq_distances
+        # Tepat di atas centroid: semua bobot ke centroid itu
+        exact = sq_distances == 0
+        weights[exact.any(axis=1)] = exact[exact.any(axis=1)]
+        memberships = weights / weights.sum(axis=1, keepdims=True)
+
+        return {
+            'clusters': clusters,
+            'distances': np.sqrt(sq_distances),
+            'memberships': memberships,
+            'confidence': memberships[np.arange(len(clusters)), clusters],
+            'contributions': (X_scaled - self.centroids[clusters]) ** 2,
+        }
+
+    def save(self, path):
+        arrays = dict(
+            version=np.array(self.version),
+            features=np.array(self.features),
+            center=self.center,
+            scale=self.scale,
+            centroids=self.centroids,
+            labels=np.array(self.labels),
+        )
+        if self.counts is not None: arrays['counts'] = self.counts
+        np.savez(path, **arrays)
+
+    @classmethod
+    def from_sklearn(cls, scaler, model, features, labels=DEFAULT_LABELS):
+        n_features = len(features)
+        center = scaler.center_ if scaler.center_ is not None else np.zeros(n_features)
+        scale = scaler.scale_ if scaler.scale_ is not None else np.ones(n_features)
+        counts = np.bincount(model.labels_, minlength=len(model.cluster_centers_)) if hasattr(model, 'labels_') else None
+        return cls(features, center, scale, model.cluster_centers_, labels, counts=counts)
+
+
+def load_bundle(path):
+    # Gagal load = error keras, bukan model None diam-diam
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Model bundle not found: {path} (run train.py first)")
+
+    with np.load(path, allow_pickle=False) as data:
+        version = int(data['version'])
+        if version != BUNDLE_VERSION:
+            raise ValueError(f"Unsupported model bundle version {version} (expected {BUNDLE_VERSION}): {path}")
+        return ModelBundle(
+            features=data['features'].tolist(),
+            center=data['center'],
+            scale=data['scale'],
+            centroids=data['centroids'],
+            labels=data['labels'].tolist(),
+            version=version,
+            counts=data['counts'] if 'counts' in data.files else None,
+        )
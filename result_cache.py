@@ -0,0 +1,71 @@
+import os
+import time
+import hashlib
+from collections import OrderedDict
+
+# Cache hasil /predict: user yang sama sering di-score ulang berkali-kali sehari dengan
+# data yang sama persis. Key = hash bytes body request + fingerprint model yang sedang di-load
+# (ModelBundle.fingerprint), LRU + TTL. Server tidak me-reload model di tengah jalan, jadi
+# hasil dari model lain gak mungkin ke-serve; model baru di models/ terpakai setelah restart.
+#
+#   PREDICT_CACHE_SIZE : maksimal entry (0 = cache mati)
+#   PREDICT_CACHE_TTL  : umur entry dalam detik
+PREDICT_CACHE_SIZE = int(os.getenv('PREDICT_CACHE_SIZE', 10000))
+PREDICT_CACHE_TTL = float(os.getenv('PREDICT_CACHE_TTL', 3600))
+
+
+def payload_hash(body):
+    # Hash bytes body mentah (bukan JSON kanonik dari hasil parse): murah, dan sha256 melepas
+    # GIL jadi bisa jalan di thread. Body yang isinya sama tapi beda spasi / urutan key = key beda
+    return hashlib.sha256(body).hexdigest()
+
+
+class ResultCache:
+    # Dipakai dari event loop saja (satu thread), jadi tanpa lock
+    def __init__(self, model_fingerprint, maxsize=PREDICT_CACHE_SIZE, ttl=PREDICT_CACHE_TTL):
+        self.model_fingerprint = model_fingerprint
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0
+
+    def key(self, body):
+        # Aman dipanggil dari thread lain (tidak menyentuh isi cache)
+        return f'{self.model_fingerprint}:{payload_hash(body)}'
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None: del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, value):
+        if not self.enabled: return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "model_fingerprint": self.model_fingerprint,
+        }
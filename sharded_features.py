@@ -0,0 +1,163 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from ml_utils import compute_partials, features_from_partials, assemble_features
+from snapshot import to_arrow_table
+
+# Feature engineering paralel (multi-core). Semua fitur adalah agregat per developer,
+# jadi tabel mentah di-hash-partition berdasarkan developer, tiap shard dihitung
+# di process terpisah, lalu hasilnya cukup di-concat (developer tiap shard tidak beririsan).
+#
+# Shard dikirim ke worker sebagai file Arrow IPC (di /dev/shm kalau muat, jadi tetap
+# di RAM) dan dibaca worker lewat memory map, bukan DataFrame yang di-pickle.
+#   FEATURE_SHARD_DIR : folder file shard sementara (default /dev/shm, fallback temp dir)
+#   SPILL_BUCKETS     : jumlah file bucket untuk spill_by_developer (mode --chunksize)
+FEATURE_SHARD_DIR = os.getenv('FEATURE_SHARD_DIR')
+SPILL_BUCKETS = int(os.getenv('SPILL_BUCKETS', 64))
+
+# Kolom developer tiap tabel (exam_results ikut examinees_id registrasinya)
+SHARD_KEYS = {
+    'trackings': 'developer_id',
+    'submissions': 'submitter_id',
+    'exam_registrations': 'examinees_id',
+}
+
+
+def _shard_codes(values, n_shards):
+    # Id numerik di-hash sebagai float64, jadi developer yang sama masuk shard yang sama
+    # walau dtype kolomnya beda antar tabel (int32 / int64 / float karena ada NaN)
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.number): values = values.astype(np.float64)
+    return (pd.util.hash_array(values) % np.uint64(n_shards)).astype(np.int64)
+
+
+def _split(df, codes, n_shards):
+    # Stable sort: urutan baris asli di dalam shard tetap (hasil sum float identik)
+    order = np.argsort(codes, kind='stable')
+    bounds = np.searchsorted(codes[order], np.arange(n_shards + 1))
+    return [df.iloc[order[bounds[i]:bounds[i + 1]]] for i in range(n_shards)]
+
+
+def _split_exam_results(df_res, df_reg, n_shards):
+    # Hasil ujian masuk ke shard examinee pemilik registrasinya. Kalau satu id registrasi
+    # dipakai beberapa examinee, barisnya ikut ke semua shard mereka (sama seperti inner join).
+    if df_res.empty or df_reg.empty:
+        return [df_res.iloc[:0]] * n_shards
+    links = pd.DataFrame({'row': np.arange(len(df_res)), 'id': df_res['exam_registration_id'].to_numpy()})
+    links = links.merge(df_reg[['id', 'examinees_id']], on='id', how='inner')
+    links['shard'] = _shard_codes(links['examinees_id'], n_shards)
+    links = links[['shard', 'row']].drop_duplicates().sort_values(['shard', 'row'])
+    bounds = np.searchsorted(links['shard'].to_numpy(), np.arange(n_shards + 1))
+    rows = links['row'].to_numpy()
+    return [df_res.iloc[rows[bounds[i]:bounds[i + 1]]] for i in range(n_shards)]
+
+
+def _write_shard(df, path):
+    table = to_arrow_table(df)
+    with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _read_shard(path):
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+def _shard_worker(shard_dir, keep_partials):
+    dfs = {name[:-len('.arrow')]: _read_shard(os.path.join(shard_dir, name)) for name in os.listdir(shard_dir)}
+    partials = compute_partials(dfs)
+    # Partial (hari & tutorial unik per developer) jauh lebih besar dari fitur,
+    # jadi cuma dikirim balik kalau memang dipakai (misal buat feature store)
+    return partials if keep_partials else None, features_from_partials(partials)
+
+
+def _shard_root(dfs):
+    if FEATURE_SHARD_DIR:
+        return FEATURE_SHARD_DIR
+    # /dev/shm di container sering kecil (64MB), pakai kalau muat saja
+    if os.path.isdir('/dev/shm'):
+        estimate = sum(df.memory_usage(index=False).sum() for df in dfs.values())
+        if shutil.disk_usage('/dev/shm').free > 2 * estimate:
+            return '/dev/shm'
+    return None
+
+
+def _concat(parts):
+    # Gabung hasil antar shard: dict of DataFrame (partial) / DataFrame (fitur) / None
+    present = [p for p in parts if p is not None]
+    if not present:
+        return None
+    if isinstance(present[0], dict):
+        return {key: pd.concat([p[key] for p in present]) for key in present[0]}
+    return pd.concat(present)
+
+
+def compute_partials_sharded(dfs, workers=None, n_shards=None, keep_partials=True):
+    # Return (partials, fitur per tabel), sama dengan compute_partials + features_from_partials
+    # (partials = None kalau keep_partials=False)
+    workers = workers or os.cpu_count() or 1
+    n_shards = n_shards or workers
+
+    shards = [{} for _ in range(n_shards)]
+    for name, column in SHARD_KEYS.items():
+        df = dfs.get(name)
+        if df is None or df.empty: continue
+        for shard, part in zip(shards, _split(df, _shard_codes(df[column], n_shards), n_shards)):
+            shard[name] = part
+    if dfs.get('exam_results') is not None and not dfs['exam_results'].empty:
+        df_reg = dfs.get('exam_registrations', pd.DataFrame())
+        for shard, part in zip(shards, _split_exam_results(dfs['exam_results'], df_reg, n_shards)):
+            shard['exam_results'] = part
+
+    tmp_dir = tempfile.mkdtemp(prefix='feature-shards-', dir=_shard_root(dfs))
+    try:
+        shard_dirs = []
+        for i, shard in enumerate(shards):
+            shard_dir = os.path.join(tmp_dir, str(i))
+            os.makedirs(shard_dir)
+            for name, df in shard.items():
+                _write_shard(df, os.path.join(shard_dir, f'{name}.arrow'))
+            shard_dirs.append(shard_dir)
+        del shards
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_shard_worker, shard_dirs, [keep_partials] * n_shards))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    partials = None
+    if keep_partials:
+        partials = {table: _concat([p[table] for p, _ in results]) for table in ('exams', 'submissions', 'trackings')}
+    table_features = {table: _concat([f[table] for _, f in results]) for table in ('exams', 'submissions', 'trackings')}
+    return partials, table_features
+
+
+def spill_by_developer(chunks, table, n_buckets=SPILL_BUCKETS):
+    # Buat mode chunked: chunk dari CSV (urutan baris bebas) disebar ke file bucket per
+    # developer di disk, lalu tiap bucket dikembalikan utuh sebagai satu chunk. Semua baris
+    # satu developer ada di satu bucket, jadi partial antar bucket tidak pernah tumpang tindih
+    # (merge_submissions_partials butuh itu) dan tidak perlu sort seluruh file.
+    # Bucket ditulis sebagai CSV (append), jadi dtype per chunk yang beda-beda gak masalah.
+    column = SHARD_KEYS[table]
+    with tempfile.TemporaryDirectory(prefix=f'{table}-spill-') as tmp_dir:
+        paths = [os.path.join(tmp_dir, f'{i}.csv') for i in range(n_buckets)]
+        for chunk in chunks:
+            if chunk.empty: continue
+            for path, part in zip(paths, _split(chunk, _shard_codes(chunk[column], n_buckets), n_buckets)):
+                if part.empty: continue
+                part.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+        for path in paths:
+            if os.path.exists(path):
+                yield pd.read_csv(path)
+
+
+def perform_feature_engineering_sharded(dfs, workers=None, n_shards=None):
+    # Hasilnya sama dengan perform_feature_engineering_final (urutan baris bisa beda
+    # kalau tabel users kosong, karena fallback developer diambil per shard)
+    _, table_features = compute_partials_sharded(dfs, workers, n_shards, keep_partials=False)
+    return assemble_features(dfs.get('users'), table_features)
@@ -0,0 +1,112 @@
+import os
+import json
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from ml_utils import FEATURE_COLUMNS, normalize_table, to_dt
+
+# Snapshot biner dari CSV dataset_project: load pertama parse CSV sekali (kolom yang
+# dipakai fitur saja, dtype ringkas dari ml_utils.normalize_table), simpan sebagai Feather
+# (Arrow IPC, kompresi lz4). Run berikutnya cukup memory-map snapshot dan baca kolom
+# yang dibutuhkan. Snapshot dibuat ulang per tabel kalau CSV sumbernya berubah.
+SNAPSHOT_VERSION = 2
+SNAPSHOT_COMPRESSION = 'lz4'
+# CSV di-parse per potongan baris, jadi string tanggal mentah cuma ada satu potongan di memori
+CSV_CHUNK_ROWS = 500_000
+
+
+def to_arrow_table(df):
+    # Kolom object campuran (misal status int & string) gak bisa jadi Arrow: jadikan string,
+    # null tetap null (fitur cuma baca status lewat astype(str), jadi hasilnya sama)
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        df = df.copy()
+        for col in df.columns[df.dtypes == object]:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _source_signature(path):
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _normalize(df, table):
+    df = normalize_table(df, table)
+    # users.created_at ikut di-parse, meski tidak dipakai fitur
+    return to_dt(df, ['created_at']) if table == 'users' else df
+
+
+def read_csv_table(csv_path, table):
+    # CSV -> kolom fitur dengan dtype ringkas, tanpa pernah memegang tabel mentah utuh
+    columns = FEATURE_COLUMNS[table]
+    try:
+        chunks = [_normalize(chunk, table) for chunk in pd.read_csv(csv_path, usecols=lambda c: c in columns, chunksize=CSV_CHUNK_ROWS)]
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame()
+    if not chunks:
+        return pd.DataFrame(columns=[c for c in columns])
+    df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+    # Kategori status tiap potongan bisa beda (hasil concat jadi object), ringkas ulang
+    return normalize_table(df, table) if len(chunks) > 1 else df
+
+
+def _read_meta(snapshot_dir):
+    try:
+        with open(os.path.join(snapshot_dir, 'meta.json')) as f:
+            meta = json.load(f)
+        return meta if meta.get('version') == SNAPSHOT_VERSION else {'tables': {}}
+    except (OSError, ValueError):
+        return {'tables': {}}
+
+
+def _write_meta(snapshot_dir, meta):
+    tmp_path = os.path.join(snapshot_dir, 'meta.tmp.json')
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(snapshot_dir, 'meta.json'))
+
+
+def build_snapshot_table(csv_path, snapshot_dir, table):
+    df = read_csv_table(csv_path, table)
+    tmp_path = os.path.join(snapshot_dir, f'{table}.tmp.feather')
+    feather.write_feather(to_arrow_table(df), tmp_path, compression=SNAPSHOT_COMPRESSION)
+    os.replace(tmp_path, os.path.join(snapshot_dir, f'{table}.feather'))
+    return df
+
+
+def read_snapshot_table(snapshot_dir, table, columns=None):
+    # memory_map: kolom yang tidak diminta tidak ikut dibaca dari disk.
+    # self_destruct: buffer Arrow dilepas per kolom selama konversi, jadi tabel
+    # tidak sempat ada dua kali (Arrow + pandas) di memori
+    path = os.path.join(snapshot_dir, f'{table}.feather')
+    return feather.read_table(path, columns=columns, memory_map=True).to_pandas(split_blocks=True, self_destruct=True)
+
+
+def load_tables(csv_folder, files, snapshot_dir):
+    # files: nama tabel -> nama file CSV (tanpa .csv). Hanya tabel yang dipakai fitur yang di-load.
+    os.makedirs(snapshot_dir, exist_ok=True)
+    meta = _read_meta(snapshot_dir)
+    meta['version'] = SNAPSHOT_VERSION
+    dfs = {}
+    for table in FEATURE_COLUMNS:
+        csv_path = os.path.join(csv_folder, f'{files[table]}.csv')
+        snapshot_path = os.path.join(snapshot_dir, f'{table}.feather')
+        known = meta['tables'].get(table)
+
+        if os.path.exists(csv_path):
+            signature = _source_signature(csv_path)
+            if known != signature or not os.path.exists(snapshot_path):
+                print(f"   🧊 Snapshot {table} dari CSV...")
+                dfs[table] = build_snapshot_table(csv_path, snapshot_dir, table)
+                meta['tables'][table] = signature
+                _write_meta(snapshot_dir, meta)
+                continue
+        elif not os.path.exists(snapshot_path):
+            dfs[table] = pd.DataFrame()
+            continue
+
+        # CSV tidak berubah (atau sudah tidak ada): pakai snapshot
+        dfs[table] = read_snapshot_table(snapshot_dir, table)
+    return dfs
@@ -0,0 +1,237 @@
+import io
+import os
+import re
+import json
+import asyncio
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.json as pa_json
+from ml_utils import FEATURE_COLUMNS, DATE_COLUMNS, ID_COLUMNS
+
+# Ingest tabel mentah dari body request yang di-stream, tanpa JSON raksasa dan tanpa
+# objek Python per baris: data langsung di-decode ke kolom Arrow, baru jadi DataFrame
+# setelah semua tabel terbaca. Dua format:
+#
+#   Arrow IPC (application/vnd.apache.arrow.stream): beberapa IPC stream disambung,
+#     satu per tabel, nama tabel di schema metadata 'table'. Dibaca per record batch.
+#   NDJSON (application/x-ndjson): baris header {"table": "trackings"} lalu satu objek
+#     JSON per baris sampai header berikutnya. Dibaca per blok (STREAM_BLOCK_BYTES),
+#     tiap blok di-parse pyarrow.json.
+#
+# Tabel / kolom yang tidak dipakai fitur langsung dibuang begitu di-decode.
+ARROW_STREAM_TYPE = 'application/vnd.apache.arrow.stream'
+NDJSON_TYPE = 'application/x-ndjson'
+STREAM_BLOCK_BYTES = int(os.getenv('STREAM_BLOCK_BYTES', 1 << 20))
+
+_NDJSON_HEADER_KEY = b'"table"'
+# Offset timezone di akhir string tanggal dibuang (jam lokal dipakai, sama seperti /predict)
+_TZ_SUFFIX = r'(Z|[+-]\d\d:?\d\d)$'
+_FLOAT_COLUMNS = ['rating', 'score']
+# Cuma status trackings yang boleh angka atau string (TrackingRow), status submissions selalu angka.
+# pyarrow.json gak bisa satu kolom campuran, jadi angkanya di-quote dulu (regex di level bytes per blok)
+_MIXED_STATUS_TABLE = 'trackings'
+_NUMERIC_STATUS = re.compile(rb'"status"\s*:\s*(-?[0-9][0-9.eE+-]*)')
+
+# Kolom id wajib (sama dengan field wajib Row di main.py): kosong / null = payload ditolak,
+# seperti body JSON. tutorial_id & quiz_id boleh null.
+REQUIRED_COLUMNS = {
+    'users': ['id'],
+    'trackings': ['developer_id'],
+    'submissions': ['id', 'submitter_id'],
+    'exam_registrations': ['id', 'examinees_id'],
+    'exam_results': ['exam_registration_id'],
+}
+
+
+class StreamFormatError(ValueError):
+    pass
+
+
+def _ndjson_schema(table):
+    fields = []
+    for c in FEATURE_COLUMNS[table]:
+        if c in DATE_COLUMNS.get(table, []) or c == 'created_at': fields.append((c, pa.string()))
+        elif c in ID_COLUMNS or c == 'total_questions': fields.append((c, pa.int64()))
+        elif c == 'status': fields.append((c, pa.string() if table == _MIXED_STATUS_TABLE else pa.int64()))
+        elif c in _FLOAT_COLUMNS: fields.append((c, pa.float64()))
+    return pa.schema(fields)
+
+
+def _normalize_columns(data, table):
+    # Kolom fitur saja, tanggal -> timestamp tanpa timezone, status trackings -> string
+    columns = [c for c in FEATURE_COLUMNS[table] if c in data.column_names]
+    data = data.select(columns)
+    date_columns = DATE_COLUMNS.get(table, []) + ['created_at']
+    for i, c in enumerate(columns):
+        col = data.column(i)
+        if c in date_columns:
+            if pa.types.is_string(col.type) or pa.types.is_large_string(col.type):
+                col = pc.replace_substring_regex(col, _TZ_SUFFIX, '')
+                # String kosong = null (sama seperti validasi body JSON)
+                col = pc.if_else(pc.equal(col, ''), pa.scalar(None, col.type), col)
+                try:
+                    col = col.cast(pa.timestamp('ns'))
+                except pa.ArrowInvalid as e:
+                    if table != 'users':
+                        raise StreamFormatError(f"{table}.{c}: {e}")
+                    # users.created_at tidak dipakai fitur: format aneh jadi null (sama dengan body JSON)
+                    col = pa.array(pd.to_datetime(col.to_pandas(), errors='coerce', format='mixed'), pa.timestamp('ns'))
+            elif pa.types.is_timestamp(col.type) and col.type.tz is not None:
+                col = pc.local_timestamp(col)
+        elif c == 'status' and table == _MIXED_STATUS_TABLE and not pa.types.is_string(col.type):
+            # Status angka / campuran (Arrow): samakan jadi string (fitur membaca status lewat astype(str))
+            col = col.cast(pa.string())
+        else:
+            continue
+        data = data.set_column(i, c, col)
+    return data
+
+
+def _read_arrow(f):
+    parts = {}
+    while f.peek(1):
+        try:
+            reader = pa.ipc.open_stream(f)
+        except pa.ArrowInvalid as e:
+            raise StreamFormatError(f"Invalid Arrow IPC stream: {e}")
+        table = (reader.schema.metadata or {}).get(b'table', b'').decode()
+        # Tabel yang tidak dipakai tetap dibaca habis (stream berikutnya mulai setelahnya)
+        for batch in reader:
+            if table in FEATURE_COLUMNS:
+                parts.setdefault(table, []).append(_normalize_columns(pa.Table.from_batches([batch]), table))
+    return parts
+
+
+def _header_table(line):
+    # Nama tabel kalau line adalah header ({"table": ...} dengan spasi bebas), None kalau baris data
+    try:
+        obj = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(obj, dict) or 'table' not in obj:
+        return None
+    if len(obj) != 1 or not isinstance(obj['table'], str):
+        raise StreamFormatError(f"Invalid NDJSON header line (expected only a string 'table' key): {line[:200]!r}")
+    return obj['table']
+
+
+def _ndjson_sections(f):
+    # (nama tabel, blok baris JSON) per blok, dipotong di akhir baris.
+    # Calon header dicari lewat bytes '"table"' (cepat, di level C), lalu baris itu di-decode:
+    # header = objek yang key-nya cuma 'table', jadi format spasi apa pun terdeteksi
+    table, pending = None, b''
+    while True:
+        chunk = f.read(STREAM_BLOCK_BYTES)
+        data = pending + chunk
+        end = data.rfind(b'\n') + 1 if chunk else len(data)
+        data, pending = data[:end], data[end:]
+
+        pos = search = 0
+        while True:
+            found = data.find(_NDJSON_HEADER_KEY, search)
+            if found < 0:
+                header_table = None
+                line_start = line_end = len(data)
+            else:
+                line_start = data.rfind(b'\n', 0, found) + 1
+                line_end = data.find(b'\n', found)
+                line_end = len(data) if line_end < 0 else line_end
+                header_table = _header_table(data[line_start:line_end])
+                if header_table is None:
+                    # Baris data yang kebetulan memuat "table", cari lagi setelah baris ini
+                    search = line_end + 1
+                    continue
+            rows = data[pos:line_start]
+            if rows.strip():
+                if table is None:
+                    raise StreamFormatError('NDJSON rows before the first {"table": ...} header line')
+                yield table, rows
+            if found < 0: break
+            table = header_table
+            pos = search = line_end + 1
+        if not chunk: return
+
+
+def _read_ndjson(f):
+    parts = {}
+    for table, rows in _ndjson_sections(f):
+        if table not in FEATURE_COLUMNS: continue
+        if table == _MIXED_STATUS_TABLE: rows = _NUMERIC_STATUS.sub(rb'"status":"\1"', rows)
+        try:
+            data = pa_json.read_json(
+                io.BytesIO(rows),
+                read_options=pa_json.ReadOptions(block_size=max(len(rows), 1 << 16)),
+                parse_options=pa_json.ParseOptions(explicit_schema=_ndjson_schema(table), unexpected_field_behavior='ignore'),
+            )
+        except pa.ArrowInvalid as e:
+            raise StreamFormatError(f"{table}: {e}")
+        # Blok tanpa key status sama sekali: jangan bikin kolom status kosong (kalau seluruh
+        # trackings tanpa status, ml_utils pakai completed_at sebagai penanda selesai)
+        if 'status' in data.column_names and b'"status"' not in rows:
+            data = data.drop_columns(['status'])
+        parts.setdefault(table, []).append(_normalize_columns(data, table))
+    return parts
+
+
+def _check_required(data, table):
+    if not data.num_rows: return
+    for c in REQUIRED_COLUMNS[table]:
+        if c not in data.column_names:
+            raise StreamFormatError(f"{table}.{c}: column is required")
+        nulls = data.column(c).null_count
+        if nulls:
+            raise StreamFormatError(f"{table}.{c}: {nulls} null values, column is required")
+
+
+def read_stream_tables(f, content_type):
+    # f: file-like biner (dibaca berurutan). Return {tabel: DataFrame}, format sama dengan
+    # tabel dari body JSON /predict_batch (tabel yang tidak dikirim tidak ada di dict)
+    if content_type == ARROW_STREAM_TYPE:
+        parts = _read_arrow(f)
+    elif content_type == NDJSON_TYPE:
+        parts = _read_ndjson(f)
+    else:
+        raise StreamFormatError(f"Unsupported content type {content_type!r}, use {ARROW_STREAM_TYPE} or {NDJSON_TYPE}")
+
+    tables = {}
+    for table, chunks in parts.items():
+        try:
+            data = pa.concat_tables(chunks, promote_options='permissive')
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            raise StreamFormatError(f"{table}: {e}")
+        del chunks[:]
+        _check_required(data, table)
+        tables[table] = data.to_pandas(split_blocks=True, self_destruct=True)
+    return tables
+
+
+class AsyncBodyReader(io.RawIOBase):
+    # File-like sync di atas async iterator (misal request.stream()), dibaca dari thread lain:
+    # potongan body diminta ke event loop saat dibutuhkan, jadi body tidak pernah di-buffer utuh
+    def __init__(self, chunks, loop):
+        self._chunks = chunks
+        self._loop = loop
+        self._buffer = memoryview(b'')
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not len(self._buffer):
+            try:
+                chunk = asyncio.run_coroutine_threadsafe(self._chunks.__anext__(), self._loop).result()
+            except StopAsyncIteration:
+                return 0
+            self._buffer = memoryview(chunk)
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+
+async def read_request_tables(chunks, content_type):
+    # Decode body yang masih mengalir di thread terpisah, event loop tetap bebas
+    loop = asyncio.get_running_loop()
+    f = io.BufferedReader(AsyncBodyReader(chunks, loop), STREAM_BLOCK_BYTES)
+    return await loop.run_in_executor(None, read_stream_tables, f, content_type)
@@ -3,33 +3,113 @@ import numpy as np
 import joblib
 import gdown
 import os
+import argparse
 from sklearn.preprocessing import RobustScaler
 from sklearn.cluster import KMeans
-from ml_utils import perform_feature_engineering_final
+from ml_utils import compute_partials, compute_partials_chunked, build_features_from_partials, assemble_features, FEATURE_COLUMNS, TRACKING_COLUMNS, SUBMISSION_COLUMNS
+from sharded_features import compute_partials_sharded, spill_by_developer
+from snapshot import load_tables, read_csv_table
+from feature_store import FeatureStore, save_feature_store
+from model_bundle import ModelBundle, DEFAULT_LABELS, BUNDLE_FILENAME, load_bundle
+from incremental_training import update_bundle, LabelDriftError
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--chunksize', type=int, default=0,
+                    help='Baca CSV trackings & submissions per N baris (0 = load semua ke memori)')
+parser.add_argument('--feature-store', default=None,
+                    help='Simpan fitur + partial aggregate ke folder ini (buat inference & update incremental)')
+parser.add_argument('--from-feature-store', default=None,
+                    help='Training langsung dari feature store yang sudah ada (skip baca CSV)')
+parser.add_argument('--workers', type=int, default=1,
+                    help='Masak fitur paralel di N process, data di-shard per developer (1 = satu core)')
+parser.add_argument('--snapshot-dir', default='dataset_snapshot',
+                    help='Folder snapshot Feather dari CSV (dibuat saat load pertama, dipakai ulang kalau CSV tidak berubah)')
+parser.add_argument('--no-snapshot', action='store_true',
+                    help='Selalu baca & parse CSV langsung, tanpa snapshot')
+parser.add_argument('--incremental', action='store_true',
+                    help='Update centroid model yang ada pakai user baru/berubah saja (butuh --feature-store berisi fitur training sebelumnya)')
+parser.add_argument('--batch-size', type=int, default=1024,
+                    help='Ukuran mini-batch untuk --incremental')
+parser.add_argument('--max-drift', type=float, default=0.5,
+                    help='Batas geser centroid (x jarak ke centroid lain terdekat) sebelum label dianggap tidak valid')
+args = parser.parse_args()
+if args.workers > 1 and args.chunksize:
+    parser.error('--workers dan --chunksize tidak bisa dipakai bersamaan')
+if args.incremental:
+    if args.from_feature_store:
+        parser.error('--incremental butuh data baru, tidak bisa dengan --from-feature-store')
+    if not args.feature_store or not os.path.exists(os.path.join(args.feature_store, 'meta.json')):
+        parser.error('--incremental butuh --feature-store yang sudah berisi fitur training sebelumnya')
 
 # 1. LOAD DATA
 output_folder = 'dataset_project'
-if not os.path.exists(output_folder):
+use_snapshot = not args.no_snapshot and not args.chunksize
+# Snapshot yang sudah ada cukup untuk training, gak perlu download CSV lagi
+if not os.path.exists(output_folder) and not (use_snapshot and os.path.exists(os.path.join(args.snapshot_dir, 'meta.json'))):
     os.makedirs(output_folder)
     url = 'https://drive.google.com/drive/folders/1uRI03cmYx24CzIfGmjoIB6UBwv0oTy_v?usp=sharing'
     gdown.download_folder(url=url, output=output_folder, quiet=True, use_cookies=False)
 
-files = ['users', 'developer_journeys', 'developer_journey_tutorials', 'developer_journey_trackings', 
-         'developer_journey_submissions', 'developer_journey_completions', 'exam_registrations', 'exam_results']
-dfs = {}
-for f in files:
+# Nama tabel (yang dipakai ml_utils) -> nama file CSV
+files = {
+    'users': 'users',
+    'journeys': 'developer_journeys',
+    'tutorials': 'developer_journey_tutorials',
+    'trackings': 'developer_journey_trackings',
+    'submissions': 'developer_journey_submissions',
+    'completions': 'developer_journey_completions',
+    'exam_registrations': 'exam_registrations',
+    'exam_results': 'exam_results',
+}
+chunked_tables = {'trackings': TRACKING_COLUMNS, 'submissions': SUBMISSION_COLUMNS}
+
+def read_tables():
+    # Semua tabel (in-memory): dari snapshot kalau bisa, fallback parse CSV
+    if use_snapshot:
+        return load_tables(output_folder, files, args.snapshot_dir)
+    return {name: read_table(name) for name in FEATURE_COLUMNS}
+
+def read_table(name):
+    # Kolom yang dipakai fitur saja, langsung dtype ringkas (tabel mentah lebar gak pernah ada di memori)
     try:
-        path = f'{output_folder}/{f}.csv'
-        if not os.path.exists(path): path = f'{output_folder}/{f if "developer" in f else "developer_journey_" + f}.csv'
-        dfs[f] = pd.read_csv(f'{output_folder}/{f}.csv')
-    except: dfs[f] = pd.DataFrame()
+        return read_csv_table(f'{output_folder}/{files[name]}.csv', name)
+    except: return pd.DataFrame()
+
+def read_chunks(name):
+    # Cuma kolom yang dipakai fitur yang dibaca, per chunk
+    path = f'{output_folder}/{files[name]}.csv'
+    if not os.path.exists(path): return
+    columns = chunked_tables[name]
+    for chunk in pd.read_csv(path, usecols=lambda c: c in columns, chunksize=args.chunksize):
+        yield chunk
 
 # 2. MASAK DATA
-print("🍳 Cooking Features...")
-df_master = perform_feature_engineering_final(dfs)
+if args.from_feature_store:
+    # Pakai fitur yang sudah tersimpan, gak perlu masak ulang dari CSV
+    print("📦 Loading Features from store...")
+    df_master = FeatureStore(args.from_feature_store).to_frame()
+else:
+    print("🍳 Cooking Features...")
+    if args.chunksize:
+        dfs = {name: read_table(name) for name in FEATURE_COLUMNS if name not in chunked_tables}
+        partials = compute_partials_chunked(
+            dfs,
+            trackings_chunks=read_chunks('trackings'),
+            # Submission di CSV belum tentu urut id per submitter: disebar dulu ke bucket per
+            # developer di disk, tiap bucket (semua submission user-nya) dimasak utuh
+            submissions_chunks=spill_by_developer(read_chunks('submissions'), 'submissions'),
+        )
+        df_master = build_features_from_partials(dfs['users'], partials)
+    elif args.workers > 1:
+        dfs = read_tables()
+        partials, table_features = compute_partials_sharded(dfs, args.workers, keep_partials=bool(args.feature_store))
+        df_master = assemble_features(dfs['users'], table_features)
+    else:
+        dfs = read_tables()
+        partials = compute_partials(dfs)
+        df_master = build_features_from_partials(dfs['users'], partials)
 
 # 3. TRAINING
-print("🏋️‍♂️ Training KMeans...")
 # List fitur final (sesuai diskusi kita)
 features_final = [
     'avg_weighted_exam_score',
@@ -47,15 +127,42 @@ features_final = [
 for col in features_final:
     if col not in df_master.columns: df_master[col] = 0
 
-X = df_master[features_final].fillna(0)
+if args.incremental:
+    # Scaler & centroid lama di-update pakai user baru / yang fiturnya berubah saja
+    # (dibanding fitur di feature store), label cluster dicek tetap valid
+    print("🏋️‍♂️ Updating KMeans (incremental)...")
+    bundle = load_bundle(f'models/{BUNDLE_FILENAME}')
+    if bundle.features != features_final:
+        raise SystemExit("❌ Fitur model lama beda dengan features_final, jalankan training penuh.")
+    df_previous = FeatureStore(args.feature_store).to_frame()
+    try:
+        bundle, info = update_bundle(bundle, df_previous, df_master, args.batch_size, args.max_drift)
+    except LabelDriftError as e:
+        raise SystemExit(f"❌ {e}")
+    print(f"   {info['new_users']} user baru, {info['changed_users']} user berubah, {info['removed_users']} user dihapus, drift: {info['drift']}")
+    if info['relabelled']: print("   ⚠️ Urutan cluster tertukar, sudah disesuaikan lagi dengan label lama.")
+
+    scaler = joblib.load('models/scaler.pkl')
+    model = joblib.load('models/kmeans_model.pkl')
+    # Pickle sklearn ikut disamakan dengan bundle: centroid baru + assignment & inertia
+    # semua user saat ini (bukan labels_ dari fit lama)
+    X_scaled = bundle.transform(df_master[features_final].fillna(0).to_numpy(dtype=np.float64))
+    labels = bundle.predict_scaled(X_scaled)
+    model.cluster_centers_ = bundle.centroids
+    model.labels_ = labels.astype(np.int32)
+    model.inertia_ = float(((X_scaled - bundle.centroids[labels]) ** 2).sum())
+else:
+    print("🏋️‍♂️ Training KMeans...")
+    X = df_master[features_final].fillna(0)
 
-# Scale
-scaler = RobustScaler()
-X_scaled = scaler.fit_transform(X)
+    # Scale
+    scaler = RobustScaler()
+    X_scaled = scaler.fit_transform(X)
 
-# Fit KMeans (k=3)
-model = KMeans(n_clusters=3, random_state=42, n_init=10)
-model.fit(X_scaled)
+    # Fit KMeans (k=3)
+    model = KMeans(n_clusters=3, random_state=42, n_init=10)
+    model.fit(X_scaled)
+    bundle = ModelBundle.from_sklearn(scaler, model, features_final, DEFAULT_LABELS)
 
 # 4. SAVE
 print("Saving Models...")
@@ -63,4 +170,11 @@ os.makedirs('models', exist_ok=True)
 joblib.dump(model, 'models/kmeans_model.pkl')
 joblib.dump(scaler, 'models/scaler.pkl')
 joblib.dump(features_final, 'models/feature_list.pkl')
+# Artifact yang dipakai inference (fitur + scaler + centroid dalam satu file)
+bundle.save(f'models/{BUNDLE_FILENAME}')
+
+# Feature store disimpan setelah model, jadi acuan user baru/berubah untuk --incremental berikutnya
+if args.feature_store and not args.from_feature_store:
+    print("📦 Saving Feature Store...")
+    save_feature_store(df_master, partials, args.feature_store)
 print("✅ Training Selesai. Model tersimpan.")
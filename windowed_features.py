@@ -0,0 +1,314 @@
+import os
+import numpy as np
+import pandas as pd
+from ml_utils import ALL_FEATURES, _prepare_tables, _is_completed, _week_of_year
+
+# Fitur per (developer, window waktu) untuk banyak window sekaligus, misal insight
+# "minggu ini" untuk semua user di banyak minggu, tanpa menjalankan ulang pipeline per window.
+#
+# Window j = [start_j, cutoff_j): event sebelum cutoff, sejak cutoff - window (rolling)
+# atau sejak awal (snapshot kumulatif). Waktu event: trackings.completed_at,
+# submissions.created_at, exam_registrations.created_at (hasil ujian ikut registrasinya).
+# Hasil tiap window = perform_feature_engineering_final pada event di window itu
+# (event tanpa waktu tidak masuk window manapun).
+#
+# Window diurutkan, jadi window yang memuat satu baris selalu rentang kontigu [lo, hi).
+# Agregat per (developer, window) = difference array (+w di lo, -w di hi) lalu cumsum
+# sepanjang sumbu window, satu pass per tabel. Hitungan unik (hari, minggu, tutorial, quiz)
+# pakai waktu kemunculan sebelumnya dari nilai yang sama: baris cuma dihitung di window
+# yang tidak memuat kemunculan sebelumnya.
+
+# Batas ukuran request: hasil & array agregat berukuran (jumlah developer x jumlah window)
+MAX_WINDOWS = int(os.getenv('MAX_WINDOWS', 520))
+# Array agregat & hasil dialokasikan per sel (developer x window), jadi jumlah sel juga dibatasi
+MAX_WINDOW_CELLS = int(os.getenv('MAX_WINDOW_CELLS', 2_000_000))
+MIN_WINDOW = pd.Timedelta(hours=float(os.getenv('MIN_WINDOW_HOURS', 1)))
+
+_NO_TIME = np.iinfo(np.int64).min   # belum pernah muncul sebelumnya
+_OPEN_START = _NO_TIME + 1          # start window kumulatif (-inf)
+_DAY_NS = 86_400 * 10**9
+_OWL_OFFSET_NS = pd.Timedelta(hours=2).value
+_REVISIT_BUFFER_NS = pd.Timedelta(minutes=10).value
+
+
+def _ns(col):
+    # datetime64 -> int64 nanodetik (NaT = _NO_TIME)
+    return col.to_numpy(dtype='datetime64[ns]').astype(np.int64)
+
+
+def _previous_time(dev, values, t):
+    # Waktu kemunculan sebelumnya dari (developer, nilai) yang sama, _NO_TIME kalau belum pernah.
+    # Urut waktu lalu stable sort satu key int64 (developer, nilai): jauh lebih cepat dari lexsort 3 kolom
+    codes, uniques = pd.factorize(values)
+    key = dev.astype(np.int64) * max(len(uniques), 1) + codes
+    order = np.argsort(t, kind='stable')
+    order = order[np.argsort(key[order], kind='stable')]
+    key_o, t_o = key[order], t[order]
+    same = key_o[1:] == key_o[:-1]
+    prev = np.full(len(order), _NO_TIME)
+    prev[1:][same] = t_o[:-1][same]
+    result = np.empty_like(prev)
+    result[order] = prev
+    return result
+
+
+class _WindowGrid:
+    # Akumulator (developer x window) lewat difference array
+    def __init__(self, starts, ends, n_dev):
+        self.starts = starts
+        self.ends = ends
+        self.n_dev = n_dev
+        self.k = len(ends)
+
+    def ranges(self, t_first, t_last=None):
+        # Window [lo, hi) yang memuat t_first s/d t_last (start <= t_first, t_last < cutoff)
+        t_last = t_first if t_last is None else t_last
+        return np.searchsorted(self.ends, t_last, 'right'), np.searchsorted(self.starts, t_first, 'right')
+
+    def total(self, dev, lo, hi, weights=None):
+        # Jumlah weights (default 1 = count) per (developer, window)
+        width = self.k + 1
+        size = self.n_dev * width
+        diff = np.bincount(dev * width + lo, weights, size) - np.bincount(dev * width + hi, weights, size)
+        return np.cumsum(diff.reshape(self.n_dev, width), axis=1)[:, :self.k]
+
+    def distinct(self, dev, values, t):
+        # Jumlah nilai unik per (developer, window)
+        lo, hi = self.ranges(t)
+        lo = np.maximum(lo, np.searchsorted(self.starts, _previous_time(dev, values, t), 'right'))
+        return self.total(dev, lo, np.maximum(lo, hi))
+
+    def first_last(self, dev, t):
+        # Waktu pertama & terakhir per (developer, window), baris harus urut (dev, t).
+        # Return (first, last, ada) dengan first/last int64 nanodetik
+        lo, hi = self.ranges(t)
+        width = self.k + 1
+        q_dev = np.repeat(np.arange(self.n_dev), self.k)
+        q_win = np.tile(np.arange(self.k), self.n_dev)
+        query = q_dev * width + q_win
+        # Baris pertama dengan hi > j & terakhir dengan lo <= j di developer yang sama
+        first = np.searchsorted(dev * width + hi, query, 'right')
+        last = np.searchsorted(dev * width + lo, query, 'right') - 1
+        first_c = np.minimum(first, len(t) - 1)
+        present = (first < len(t)) & (dev[first_c] == q_dev) & (lo[first_c] <= q_win)
+        first_t = np.where(present, t[first_c], 0).reshape(self.n_dev, self.k)
+        last_t = np.where(present, t[np.maximum(last, 0)], 0).reshape(self.n_dev, self.k)
+        return first_t, last_t, present.reshape(self.n_dev, self.k)
+
+
+def _ratio(num, den):
+    # num / den, NaN kalau den = 0 (sama seperti .replace(0, np.nan) di ml_utils)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(den != 0, num / np.where(den != 0, den, 1), np.nan)
+
+
+def _trackings_windowed(df_t, grid, dev_index):
+    completed_at = _ns(df_t['completed_at'])
+    dev = dev_index.get_indexer(df_t['developer_id'])
+    keep = (completed_at != _NO_TIME) & (dev >= 0)
+    is_done = _is_completed(df_t).to_numpy()[keep]
+    df_t = df_t[keep]
+    dev, completed_at = dev[keep], completed_at[keep]
+    first_opened_at, last_viewed = _ns(df_t['first_opened_at']), _ns(df_t['last_viewed'])
+    lo, hi = grid.ranges(completed_at)
+
+    # Revisit: completed & ketiga tanggal valid
+    valid = is_done & (first_opened_at != _NO_TIME) & (last_viewed != _NO_TIME)
+    revisited = (last_viewed[valid] > completed_at[valid] + _REVISIT_BUFFER_NS).astype(np.float64)
+    revisit_sum = grid.total(dev[valid], lo[valid], hi[valid], revisited)
+    revisit_count = grid.total(dev[valid], lo[valid], hi[valid])
+
+    # Durasi (tanpa filter status) - Filter Idle: > 0 dan <= 30 menit (hitungan sama dengan total_seconds / 60).
+    # first_opened_at kosong -> durasi 0, otomatis tersaring
+    minutes = ((completed_at - np.where(first_opened_at != _NO_TIME, first_opened_at, completed_at)) / 1e9) / 60
+    valid = (minutes > 0) & (minutes <= 30)
+    duration_sum = grid.total(dev[valid], lo[valid], hi[valid], minutes[valid])
+    duration_count = grid.total(dev[valid], lo[valid], hi[valid])
+
+    # Hari & minggu belajar (Owl Adjustment 2 jam), tutorial unik: baris completed saja
+    adjusted = completed_at[is_done] - _OWL_OFFSET_NS
+    dev_done, t_done = dev[is_done], completed_at[is_done]
+    days = adjusted // _DAY_NS
+    active_days = grid.distinct(dev_done, days, t_done)
+    active_weeks = grid.distinct(dev_done, _week_of_year(days), t_done)
+    tutorial_id = df_t['tutorial_id'][is_done]
+    has_tutorial = tutorial_id.notna().to_numpy()
+    tutorial_codes = pd.factorize(tutorial_id[has_tutorial])[0]
+    total_tutorials = grid.distinct(dev_done[has_tutorial], tutorial_codes, t_done[has_tutorial])
+
+    # Consistency (Weighted 70:30): Span & Total Weeks (selisih waktu adjusted = selisih completed_at)
+    order = np.lexsort((t_done, dev_done))
+    first_t, last_t, present = grid.first_last(dev_done[order], t_done[order])
+    total_days = np.where(present, (last_t - first_t) // _DAY_NS + 1, np.nan)
+    total_weeks = np.ceil(total_days / 7)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        consistency = np.minimum(0.7 * (active_weeks / total_weeks) + 0.3 * (active_days / total_days), 1.0)
+
+    return {
+        'active_days': active_days,
+        'total_completed_tutorials': total_tutorials,
+        'completion_density': total_tutorials / np.where(active_days == 0, 1, active_days),
+        'consistency_score': consistency,
+        'tutorial_revisit_rate': _ratio(revisit_sum, revisit_count),
+        'avg_tutorial_duration': _ratio(duration_sum, duration_count),
+    }
+
+
+def _submissions_windowed(df_sub, grid, dev_index):
+    created_at = _ns(df_sub['created_at'])
+    dev = dev_index.get_indexer(df_sub['submitter_id'])
+    keep = (created_at != _NO_TIME) & (dev >= 0)
+    df_sub = df_sub[keep]
+    dev, created_at = dev[keep], created_at[keep]
+    lo, hi = grid.ranges(created_at)
+
+    # Rating: semua submission yang punya rating
+    rating = df_sub['rating'].to_numpy(dtype=np.float64)
+    valid = ~np.isnan(rating)
+    rating_sum = grid.total(dev[valid], lo[valid], hi[valid], rating[valid])
+    rating_count = grid.total(dev[valid], lo[valid], hi[valid])
+
+    # Revisi per (submitter, quiz) dari submission dengan status != -2
+    valid = ((df_sub['status'] != -2) & df_sub['quiz_id'].notna()).to_numpy()
+    df_valid = df_sub[valid]
+    dev, created_at, lo, hi = dev[valid], created_at[valid], lo[valid], hi[valid]
+    quiz = pd.factorize(df_valid['quiz_id'])[0]
+    n_quizzes = grid.distinct(dev, quiz, created_at)
+    is_revision = (df_valid['status'] == -1).to_numpy()
+    total_revisions = grid.total(dev[is_revision], lo[is_revision], hi[is_revision])
+
+    # Pasangan submission berurutan (id) di quiz yang sama, dihitung di window yang memuat keduanya.
+    # Sama dengan pipeline per window selama created_at naik searah id di tiap quiz.
+    order = np.lexsort((df_valid['id'].to_numpy(), quiz, dev))
+    dev_o, quiz_o, created_o = dev[order], quiz[order], created_at[order]
+    prev_ended = _ns(df_valid['ended_review_at'])[order][:-1]
+    # ended_review_at kosong -> selisih 0, otomatis tersaring
+    prev_ended = np.where(prev_ended != _NO_TIME, prev_ended, created_o[1:])
+    pair = (dev_o[1:] == dev_o[:-1]) & (quiz_o[1:] == quiz_o[:-1])
+    hours = ((created_o[1:] - prev_ended) / 1e9) / 3600
+    pair &= (hours > 0) & (hours <= 720)
+    t_first = np.minimum(created_o[:-1], created_o[1:])[pair]
+    t_last = np.maximum(created_o[:-1], created_o[1:])[pair]
+    pair_lo, pair_hi = grid.ranges(t_first, t_last)
+    pair_hi = np.maximum(pair_lo, pair_hi)
+    duration_sum = grid.total(dev_o[1:][pair], pair_lo, pair_hi, hours[pair])
+    duration_count = grid.total(dev_o[1:][pair], pair_lo, pair_hi)
+
+    return {
+        'avg_submission_revision_count': _ratio(total_revisions, n_quizzes),
+        'avg_submission_revision_duration': _ratio(duration_sum, duration_count),
+        'avg_submission_rating': _ratio(rating_sum, rating_count),
+    }
+
+
+def _exams_windowed(df_reg, df_res, grid, dev_index):
+    created_at = _ns(df_reg['created_at'])
+    dev = dev_index.get_indexer(df_reg['examinees_id'])
+    keep = (created_at != _NO_TIME) & (dev >= 0)
+    df_reg = df_reg[keep]
+    dev, created_at = dev[keep], created_at[keep]
+    lo, hi = grid.ranges(created_at)
+
+    # avg_weighted_exam_score: hasil ujian ikut window registrasinya
+    weighted_sum = questions_sum = np.zeros((grid.n_dev, grid.k))
+    if not df_res.empty:
+        links = pd.DataFrame({'id': df_reg['id'].to_numpy(), 'row': np.arange(len(df_reg))})
+        merged = df_res[['exam_registration_id', 'score', 'total_questions']].merge(
+            links, left_on='exam_registration_id', right_on='id', how='inner')
+        rows = merged['row'].to_numpy()
+        questions = merged['total_questions'].to_numpy(dtype=np.float64)
+        weighted = merged['score'].to_numpy(dtype=np.float64) * questions
+        has_w, has_q = ~np.isnan(weighted), ~np.isnan(questions)
+        weighted_sum = grid.total(dev[rows][has_w], lo[rows][has_w], hi[rows][has_w], weighted[has_w])
+        questions_sum = grid.total(dev[rows][has_q], lo[rows][has_q], hi[rows][has_q], questions[has_q])
+
+    # exam_duration_utilization_ratio: Filter finished & deadline > created
+    deadline_at, finished_at = _ns(df_reg['deadline_at']), _ns(df_reg['exam_finished_at'])
+    valid = (finished_at != _NO_TIME) & (deadline_at != _NO_TIME) & (deadline_at > created_at)
+    max_seconds = (deadline_at[valid] - created_at[valid]) / 1e9
+    used_seconds = (finished_at[valid] - created_at[valid]) / 1e9
+    ratio = np.clip(used_seconds / max_seconds, 0.0, 1.0)
+    util_sum = grid.total(dev[valid], lo[valid], hi[valid], ratio)
+    util_count = grid.total(dev[valid], lo[valid], hi[valid])
+
+    return {
+        'avg_weighted_exam_score': weighted_sum / np.where(questions_sum == 0, 1, questions_sum),
+        'exam_duration_utilization_ratio': _ratio(util_sum, util_count),
+    }
+
+
+def _developer_index(dfs):
+    # Basis user sama dengan assemble_features: tabel users, fallback developer di trackings/submissions
+    if not dfs['users'].empty:
+        return pd.Index(pd.unique(dfs['users']['id']))
+    ids = [dfs[t][c] for t, c in [('trackings', 'developer_id'), ('submissions', 'submitter_id')] if not dfs[t].empty]
+    return pd.Index(pd.unique(pd.concat(ids).dropna())) if ids else pd.Index([])
+
+
+class WindowLimitError(ValueError):
+    # Permintaan window di luar batas (terlalu banyak / terlalu kecil), salah di sisi pemanggil
+    pass
+
+
+def _check_window_count(n_windows):
+    if n_windows > MAX_WINDOWS:
+        raise WindowLimitError(f"{n_windows} windows requested, at most {MAX_WINDOWS} allowed (MAX_WINDOWS)")
+
+
+def _check_cell_count(n_developers, n_windows):
+    if n_developers * n_windows > MAX_WINDOW_CELLS:
+        raise WindowLimitError(
+            f"{n_developers} developers x {n_windows} windows = {n_developers * n_windows} cells, "
+            f"at most {MAX_WINDOW_CELLS} allowed (MAX_WINDOW_CELLS); send fewer users or windows per request"
+        )
+
+
+def rolling_cutoffs(dfs, window):
+    # Cutoff tiap `window` dari awal hari event pertama sampai melewati event terakhir
+    window = pd.Timedelta(window)
+    times = [dfs[t][c] for t, c in [('trackings', 'completed_at'), ('submissions', 'created_at'), ('exam_registrations', 'created_at')]
+             if t in dfs and not dfs[t].empty and c in dfs[t].columns]
+    times = pd.concat([pd.to_datetime(t, errors='coerce') for t in times]).dropna() if times else pd.Series([], dtype='datetime64[ns]')
+    if times.empty:
+        return pd.DatetimeIndex([])
+    start = times.min().floor('D')
+    n_windows = int((times.max() - start) // window) + 1
+    _check_window_count(n_windows)
+    return pd.DatetimeIndex([start + window * (i + 1) for i in range(n_windows)])
+
+
+def perform_feature_engineering_windowed(dfs, cutoffs=None, window=None):
+    # cutoffs: tanggal batas (event < cutoff). window: ukuran window (misal '7D').
+    #   cutoffs saja   -> snapshot kumulatif s/d tiap cutoff
+    #   + window       -> cuma event di [cutoff - window, cutoff)
+    #   window saja    -> rolling window berurutan yang menutupi seluruh data (rolling_cutoffs)
+    # Return DataFrame index (developer_id, cutoff), kolom ALL_FEATURES, satu baris per user x window.
+    if cutoffs is None and window is None:
+        raise ValueError("Pass cutoff dates, a window size, or both")
+    window = pd.Timedelta(window) if window is not None else None
+    if window is not None and window < MIN_WINDOW:
+        raise WindowLimitError(f"Window size must be at least {MIN_WINDOW}, got {window}")
+
+    dfs = _prepare_tables(dfs, ['users', 'exam_results', 'exam_registrations', 'submissions', 'trackings'])
+    if cutoffs is None:
+        cutoffs = rolling_cutoffs(dfs, window)
+    cutoffs = pd.DatetimeIndex(pd.to_datetime(cutoffs)).as_unit('ns').unique().sort_values()
+    # Dicek sebelum array (developer x window) apa pun dialokasikan
+    _check_window_count(len(cutoffs))
+    ends = cutoffs.asi8
+    starts = ends - window.value if window is not None else np.full(len(ends), _OPEN_START)
+
+    dev_index = _developer_index(dfs)
+    _check_cell_count(len(dev_index), len(cutoffs))
+    grid = _WindowGrid(starts, ends, len(dev_index))
+    values = {}
+    if not dfs['exam_registrations'].empty:
+        values.update(_exams_windowed(dfs['exam_registrations'], dfs['exam_results'], grid, dev_index))
+    if not dfs['submissions'].empty:
+        values.update(_submissions_windowed(dfs['submissions'], grid, dev_index))
+    if not dfs['trackings'].empty:
+        values.update(_trackings_windowed(dfs['trackings'], grid, dev_index))
+
+    index = pd.MultiIndex.from_product([dev_index.astype(np.int64), cutoffs], names=['developer_id', 'cutoff'])
+    columns = {name: values[name].ravel() if name in values else 0.0 for name in ALL_FEATURES}
+    return pd.DataFrame(columns, index=index).fillna(0.0)
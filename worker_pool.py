@@ -0,0 +1,85 @@
+import os
+import asyncio
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import metrics
+
+# Worker pool untuk kerjaan CPU (feature engineering + predict) supaya event loop
+# FastAPI gak ke-block. Jumlah request yang boleh antre dibatasi: kalau penuh,
+# request langsung ditolak (503) daripada antre diam-diam dan bikin latency meledak.
+#
+#   PREDICT_EXECUTOR  : 'process' (default, pakai semua core) atau 'thread'
+#   PREDICT_WORKERS   : jumlah worker (default: jumlah core)
+#   PREDICT_MAX_QUEUE : maksimal request yang menunggu worker (default: 4x worker)
+PREDICT_EXECUTOR = os.getenv('PREDICT_EXECUTOR', 'process')
+PREDICT_WORKERS = int(os.getenv('PREDICT_WORKERS', os.cpu_count() or 1))
+PREDICT_MAX_QUEUE = int(os.getenv('PREDICT_MAX_QUEUE', PREDICT_WORKERS * 4))
+
+
+class PoolSaturated(Exception):
+    def __init__(self, queue_depth):
+        super().__init__(f"Worker pool saturated (queue depth {queue_depth})")
+        self.queue_depth = queue_depth
+
+
+class BoundedPool:
+    def __init__(self, kind=PREDICT_EXECUTOR, workers=PREDICT_WORKERS, max_queue=PREDICT_MAX_QUEUE):
+        if kind not in ('process', 'thread'):
+            raise ValueError(f"PREDICT_EXECUTOR must be 'process' or 'thread', got {kind!r}")
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.in_flight = 0
+        self._executor = None
+
+    @property
+    def queue_depth(self):
+        # Request yang sudah diterima tapi belum dapat worker
+        return max(self.in_flight - self.workers, 0)
+
+    def _get_executor(self):
+        # Dibuat saat request pertama (bukan saat import) biar worker process di-fork setelah app siap
+        if self._executor is None:
+            if self.kind == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    @property
+    def saturated(self):
+        # Request baru pasti ditolak slot() / run()
+        return self.in_flight >= self.workers + self.max_queue
+
+    @asynccontextmanager
+    async def slot(self):
+        # Satu tempat di antrean pool untuk rentang kerja yang lebih panjang dari satu job,
+        # misal decode body stream + predict: decode ikut dibatasi, bukan jalan bebas di luar pool.
+        # Job di dalamnya dijalankan lewat execute(). Counter aman tanpa lock karena hanya
+        # diubah dari event loop
+        if self.saturated:
+            raise PoolSaturated(self.queue_depth)
+        self.in_flight += 1
+        try:
+            yield self
+        finally:
+            self.in_flight -= 1
+
+    async def execute(self, fn, *args):
+        # Jalankan job di worker; pemanggil harus sudah memegang slot()
+        loop = asyncio.get_running_loop()
+        # Metrics stage dari worker ikut dibawa pulang ke registry process utama
+        result, observations = await loop.run_in_executor(self._get_executor(), metrics.collect, fn, *args)
+        metrics.replay(observations)
+        return result
+
+    async def run(self, fn, *args):
+        async with self.slot():
+            return await self.execute(fn, *args)
+
+    def shutdown(self):
+        if self._executor is not None:
+            # Tunggu worker process benar-benar keluar: worker yatim masih memegang socket
+            # listen hasil fork, request ke server pengganti di port yang sama bisa nyangkut
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None